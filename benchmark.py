@@ -0,0 +1,282 @@
+''' Snap4city GTFS processor.
+   Copyright (C) 2021 DISIT Lab http://www.disit.org - University of Florence
+   This program is free software: you can redistribute it and/or modify
+   it under the terms of the GNU Affero General Public License as
+   published by the Free Software Foundation, either version 3 of the
+   License, or (at your option) any later version.
+   This program is distributed in the hope that it will be useful,
+   but WITHOUT ANY WARRANTY; without even the implied warranty of
+   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+   GNU Affero General Public License for more details.
+   You should have received a copy of the GNU Affero General Public License
+   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+# Conversion benchmark: generates a synthetic GTFS feed, times every gtfs2n3 stage and stores the results as JSON.
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from zipfile import ZipFile, ZIP_DEFLATED
+import numpy as np
+import pandas as pd
+import os, io, sys, gzip, json, sqlite3, hashlib, argparse, platform, tempfile, datetime
+
+from gtfs2n3 import Converter, FileSink, read_binary_triples
+
+# extractors of the conversion stages, in conversion order
+_STAGES = (
+    '_extract_agencies_triples',
+    '_extract_calendar_dates_triples',
+    '_extract_stop_triples',
+    '_extract_stop_times_triples',
+    '_extract_trips_triples',
+    '_extract_shapes_triples',
+    '_extract_routes_triples',
+)
+
+
+def _write_table(feed: ZipFile, name: str, table: pd.DataFrame, blank_lines: int = 0, rng=None):
+    with feed.open(name, 'w') as member, io.TextIOWrapper(member, encoding='utf-8', newline='') as text:
+        if not blank_lines:
+            table.to_csv(text, index=False)
+            return
+        # blank lines between the rows, which the parser skips
+        lines = np.array(table.to_csv(index=False, lineterminator='\n').split('\n'), dtype=object)
+        text.write('\n'.join(np.insert(lines, rng.integers(1, len(lines), blank_lines), '')))
+
+
+def generate_feed(path: str, stops: int = 1000, routes: int = 50, trips: int = 2000, stop_times_per_trip: int = 30,
+                  shapes: int = 100, shape_points: int = 200, services: int = 10, seed: int = 0,
+                  blank_lines: int = 0):
+    """Write a synthetic GTFS zip with the tables read by the converter and the given number of rows.
+
+    ``blank_lines`` are scattered in each of the tables converted in row ranges (stop_times, trips and shapes).
+    """
+    rng = np.random.default_rng(seed)
+    # apart from the rows, so that the feed is the same with or without blank lines
+    blank_rng = np.random.default_rng([seed, 1])
+    with ZipFile(path, 'w', ZIP_DEFLATED) as feed:
+        _write_table(feed, 'agency.txt', pd.DataFrame({
+            'agency_id': ['OASA'], 'agency_name': ['Synthetic "Transit"'], 'agency_url': ['http://example.org'],
+            'agency_timezone': ['Europe/Athens'], 'agency_lang': ['el']}))
+
+        service_id = np.array(['S%d' % i for i in range(services)], dtype=object)
+        dates = pd.date_range('2024-01-01', periods=30).strftime('%Y%m%d')
+        _write_table(feed, 'calendar_dates.txt', pd.DataFrame({
+            'service_id': np.repeat(service_id, len(dates)), 'date': np.tile(dates, services), 'exception_type': 1}))
+
+        stop_code = pd.array(rng.integers(1000, 100000, stops), dtype='Int64')
+        stop_code[rng.random(stops) < 0.05] = pd.NA
+        _write_table(feed, 'stops.txt', pd.DataFrame({
+            'stop_id': np.arange(stops), 'stop_code': stop_code, 'stop_name': ['Stop "%d"' % i for i in range(stops)],
+            'stop_desc': '', 'stop_lat': np.round(37.9 + rng.random(stops) * 0.2, 6),
+            'stop_lon': np.round(23.6 + rng.random(stops) * 0.2, 6)}))
+
+        route_id = np.array(['R%d' % i for i in range(routes)], dtype=object)
+        _write_table(feed, 'routes.txt', pd.DataFrame({
+            'route_id': route_id, 'route_short_name': ['%dA' % i for i in range(routes)],
+            'route_long_name': ['Route "%d"' % i for i in range(routes)], 'route_type': rng.choice([0, 1, 3], routes),
+            'route_color': 'FF0000', 'route_text_color': '000000'}))
+
+        trip_id = np.array(['T%d' % i for i in range(trips)], dtype=object)
+        trip_short_name = np.where(rng.random(trips) < 0.5, '', trip_id)
+        _write_table(feed, 'trips.txt', pd.DataFrame({
+            'route_id': route_id[rng.integers(0, routes, trips)], 'service_id': service_id[rng.integers(0, services, trips)],
+            'trip_id': trip_id, 'direction_id': rng.integers(0, 2, trips),
+            'shape_id': ['SH%d' % i for i in rng.integers(0, shapes, trips)], 'trip_short_name': trip_short_name}),
+            blank_lines, blank_rng)
+
+        departure = np.repeat(rng.integers(5 * 3600, 22 * 3600, trips), stop_times_per_trip) + \
+            np.tile(np.arange(stop_times_per_trip) * 90, trips)
+        clock = [pd.Series(part).astype(str).str.zfill(2).to_numpy(dtype=object)
+                 for part in (departure // 3600, departure // 60 % 60, departure % 60)]
+        _write_table(feed, 'stop_times.txt', pd.DataFrame({
+            'trip_id': np.repeat(trip_id, stop_times_per_trip),
+            'arrival_time': clock[0] + ':' + clock[1] + ':' + clock[2],
+            'departure_time': clock[0] + ':' + clock[1] + ':' + clock[2],
+            'stop_id': rng.integers(0, stops, trips * stop_times_per_trip),
+            'stop_sequence': np.tile(np.arange(1, stop_times_per_trip + 1), trips)}), blank_lines, blank_rng)
+
+        _write_table(feed, 'shapes.txt', pd.DataFrame({
+            'shape_id': np.repeat(['SH%d' % i for i in range(shapes)], shape_points),
+            'shape_pt_lat': np.round(37.9 + rng.random(shapes * shape_points) * 0.2, 6),
+            'shape_pt_lon': np.round(23.6 + rng.random(shapes * shape_points) * 0.2, 6),
+            'shape_pt_sequence': np.tile(np.arange(1, shape_points + 1), shapes)}), blank_lines, blank_rng)
+
+
+def _run_stage(feed_path: str, output_directory: str, output_format: str, extractor: str, entry_name: str,
+               chunk_size: int = None):
+    # runs in a fresh worker process, so that the peak RSS of the report belongs to this stage only
+    with ZipFile(feed_path, 'r') as feed:
+        return getattr(Converter(output_directory, output_format), extractor)(entry_name, feed, chunk_size)
+
+
+def _run_conversion(feed_path: str, output_directory: str, output_format: str, entry_name: str,
+                    chunk_size: int = None, workers: int = 1):
+    report = Converter(output_directory, output_format)._extract_triple(
+        entry_name, feed_path, save_original=True, chunk_size=chunk_size, workers=workers)
+    return {field: value for field, value in report.items() if field != 'stages'}
+
+
+def _output_digests(output_directory: str, output_format: str):
+    """SHA-256 of the triples of every output of a conversion, by .n3 name, the same in any of their encodings.
+
+    The triples of a graph in SQLite are in no particular order, they are sorted first.
+    """
+    digests = dict()
+    if output_format == 'sqlite':
+        with closing(sqlite3.connect(output_directory + os.sep + 'triples.sqlite')) as connection:
+            for graph, in connection.execute("SELECT DISTINCT graph FROM quads").fetchall():
+                digest = hashlib.sha256()
+                for triple in connection.execute("SELECT subject, predicate, object FROM quads WHERE graph = ? "
+                                                 "ORDER BY subject, predicate, object", (graph,)):
+                    digest.update((' '.join(triple) + ' .\n').encode('utf-8'))
+                digests[graph] = digest.hexdigest()
+        return digests
+    suffix = FileSink.formats[output_format]
+    for name in os.listdir(output_directory):
+        if not name.endswith('.n3' + suffix):
+            continue
+        digest = hashlib.sha256()
+        path = output_directory + os.sep + name
+        if output_format == 'binary':
+            for triple in read_binary_triples(path):
+                digest.update((' '.join(triple) + ' .\n').encode('utf-8'))
+        elif output_format == 'zstd':
+            import zstandard
+            with open(path, 'rb') as f:
+                text = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                for block in iter(lambda: text.read(1 << 20), b''):
+                    digest.update(block)
+        else:
+            with (gzip.open if output_format == 'gzip' else open)(path, 'rb') as text:
+                for block in iter(lambda: text.read(1 << 20), b''):
+                    digest.update(block)
+        digests[name[:len(name) - len(suffix)]] = digest.hexdigest()
+    return digests
+
+
+def run_benchmark(feed_path: str, output_format: str = 'n3', entry_name: str = 'Bench', chunk_size: int = None,
+                  workers: int = 1, check: bool = False):
+    """Time every conversion stage of ``feed_path`` in its own process, then the whole conversion.
+
+    With ``check`` the results also list, as ``differences``, the outputs of the whole conversion whose triples
+    differ from those of the stage run alone.
+    """
+    stages = dict()
+    with tempfile.TemporaryDirectory() as output_directory:
+        conversion_directory = output_directory + os.sep + 'conversion'
+        os.makedirs(conversion_directory)
+        for extractor in _STAGES:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                report = pool.submit(_run_stage, feed_path, output_directory, output_format, extractor, entry_name,
+                                     chunk_size).result()
+            stage = report.pop('stage')
+            stages[stage] = report
+            print("%-15s %8.2fs %12d triples %12.0f triples/s" % (
+                stage, stages[stage]['wall_seconds'], stages[stage]['triples'], stages[stage]['triples_per_second'] or 0))
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            total = pool.submit(_run_conversion, feed_path, conversion_directory, output_format, entry_name,
+                                chunk_size, workers).result()
+        print("%-15s %8.2fs %12d triples %12.0f triples/s" % (
+            'conversion', total['wall_seconds'], total['triples'], total['triples_per_second']))
+        if not check:
+            return {'stages': stages, 'total': total}
+        conversion = _output_digests(conversion_directory, output_format)
+        differences = sorted(output for output, digest in _output_digests(output_directory, output_format).items()
+                             if conversion.get(output) != digest)
+    for output in differences:
+        print("%-15s differs from the stage run alone" % output)
+    return {'stages': stages, 'total': total, 'differences': differences}
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """List the stages whose throughput dropped by more than ``tolerance`` compared with ``baseline``.
+
+    Raises ValueError when the baseline was measured on another synthetic feed or with other options.
+    """
+    for field in ('feed', 'options'):
+        # the zip size also depends on the pandas version writing the CSV files
+        current = {name: value for name, value in results[field].items() if name != 'zip_bytes'}
+        previous = {name: value for name, value in baseline.get(field, {}).items() if name != 'zip_bytes'}
+        if current != previous:
+            raise ValueError("The baseline %s %s differs from this run %s" % (field, previous, current))
+    regressions = []
+    for stage, metrics in list(results['stages'].items()) + [('conversion', results['total'])]:
+        before = baseline['total'] if stage == 'conversion' else baseline['stages'].get(stage)
+        if not before or not before.get('triples_per_second') or not metrics.get('triples_per_second'):
+            continue
+        ratio = metrics['triples_per_second'] / before['triples_per_second']
+        print("%-15s %6.2fx throughput of the baseline" % (stage, ratio))
+        if ratio < 1 - tolerance:
+            regressions.append(stage)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the GTFS to triples conversion on a synthetic feed')
+    parser.add_argument('--stops', type=int, default=1000, help='Number of stops. Default 1000')
+    parser.add_argument('--routes', type=int, default=50, help='Number of routes. Default 50')
+    parser.add_argument('--trips', type=int, default=2000, help='Number of trips. Default 2000')
+    parser.add_argument('--stop-times-per-trip', type=int, default=30, help='Stop times of every trip. Default 30')
+    parser.add_argument('--shapes', type=int, default=100, help='Number of shapes. Default 100')
+    parser.add_argument('--shape-points', type=int, default=200, help='Points of every shape. Default 200')
+    parser.add_argument('--services', type=int, default=10, help='Number of services. Default 10')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic feed. Default 0')
+    parser.add_argument('--blank-lines', type=int, default=0,
+                        help='Blank lines scattered in stop_times, trips and shapes. Default 0')
+    parser.add_argument('-f', '--output-format', type=str, default='n3',
+                        choices=['n3', 'gzip', 'zstd', 'binary', 'sqlite'],
+                        help='The format of the triples files. Default n3')
+    parser.add_argument('-c', '--chunk-size', type=int, default=None, help='Rows of every chunk. Default whole tables')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Processes of the whole conversion run; the stages always run alone. Default 1')
+    parser.add_argument('-o', '--output', type=str, default='benchmark.json',
+                        help='The JSON file receiving the results. Default benchmark.json')
+    parser.add_argument('-b', '--baseline', type=str, default=None,
+                        help='A previous results file; exit with status 1 if a throughput dropped beyond the tolerance, '
+                             '2 if it was measured on another feed or with other options')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2,
+                        help='Accepted throughput drop compared with the baseline. Default 0.2')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 3 if the triples of the whole conversion differ from those of the '
+                             'stages run alone')
+
+    args = parser.parse_args()
+    feed_parameters = {name: getattr(args, name) for name in
+                       ('stops', 'routes', 'trips', 'stop_times_per_trip', 'shapes', 'shape_points', 'services', 'seed',
+                        'blank_lines')}
+
+    with tempfile.TemporaryDirectory() as directory:
+        feed_path = directory + os.sep + 'feed.zip'
+        generate_feed(feed_path, **feed_parameters)
+        results = run_benchmark(feed_path, args.output_format, chunk_size=args.chunk_size, workers=args.workers,
+                                check=args.check)
+        feed_parameters['zip_bytes'] = os.path.getsize(feed_path)
+
+    results = {
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'feed': feed_parameters,
+        'options': {'output_format': args.output_format, 'chunk_size': args.chunk_size, 'workers': args.workers},
+        **results,
+    }
+    with open(args.output, 'w+') as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(results, baseline, args.tolerance)
+        except ValueError as error:
+            # not a regression, the runs cannot be compared
+            print(error)
+            sys.exit(2)
+        if regressions:
+            sys.exit(1)
+    if results.get('differences'):
+        sys.exit(3)
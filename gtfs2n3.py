@@ -15,13 +15,934 @@
 # modified by: Giorgos Zoutis aka Necrokefalos
 # version: v0.1
 
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 from zipfile import ZipFile
+import numpy as np
 import pandas as pd
-import os, pytz, datetime, argparse
+import os, pytz, datetime, argparse, shutil, io, gzip, mmap, re, time, hashlib, tempfile
+
+import json, sys, sqlite3
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the run report has no peak memory there
+    resource = None
+
+# number of GTFS rows rendered and written with a single f.write call
+_WRITE_BLOCK_ROWS = 8192
+
+# seconds between two progress lines of a running stage
+_PROGRESS_SECONDS = 10
+
+# columns of shapes.txt used for the shapes geometries
+_SHAPE_DTYPES = {'shape_id': str, 'shape_pt_lat': np.float64, 'shape_pt_lon': np.float64,
+                 'shape_pt_sequence': np.int32}
+
+# dtypes of the GTFS columns used by the converter: categoricals for the ids and values repeated across rows,
+# strings for the other ids and texts (never numbers, "007" stays "007"), int32 for the sequences; the stop and
+# shape coordinates stay float64 since they are written as parsed
+_GTFS_SCHEMA = {
+    'agency.txt': {'agency_id': str, 'agency_name': str, 'agency_url': str, 'agency_timezone': str,
+                   'agency_lang': str},
+    'calendar_dates.txt': {'service_id': 'category', 'date': str, 'exception_type': np.int8},
+    'stops.txt': {'stop_id': str, 'stop_code': str, 'stop_name': str, 'stop_lat': np.float64,
+                  'stop_lon': np.float64},
+    'stop_times.txt': {'trip_id': 'category', 'arrival_time': 'category', 'departure_time': 'category',
+                       'stop_id': 'category', 'stop_sequence': np.int32},
+    'trips.txt': {'route_id': 'category', 'service_id': 'category', 'trip_id': str, 'direction_id': 'category',
+                  'shape_id': 'category', 'trip_short_name': str},
+    'shapes.txt': _SHAPE_DTYPES,
+    'routes.txt': {'route_id': str, 'agency_id': 'category', 'route_short_name': str, 'route_long_name': str,
+                   'route_type': np.int16, 'route_color': str, 'route_text_color': str},
+}
+
+# layout version of the parsed tables cache, part of its key
+_CACHE_VERSION = 2
+
+
+def _str_column(column):
+    """Render every cell of a column as ``str()`` does, returning an object array of strings."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # every category used by the column is rendered once, missing values (code -1) as "nan"
+        used, codes = np.unique(column.cat.codes.to_numpy(), return_inverse=True)
+        categories = [str(value) for value in column.cat.categories[used[used >= 0]].tolist()]
+        return np.array(['nan'] * int((used < 0).any()) + categories, dtype=object)[codes]
+    values = column.to_numpy()
+    if values.dtype.kind in 'iub':
+        return values.astype(str).astype(object)
+    return np.array([str(value) for value in values.tolist()], dtype=object)
+
+
+def _read_chunks(feed: ZipFile, name: str, chunk_size: int = None, rows: tuple = None, **kwargs):
+    """Parse a GTFS table directly from its member stream inside the feed archive.
+
+    Yields the whole table as a single DataFrame or, when ``chunk_size`` is
+    given, consecutive DataFrames of at most ``chunk_size`` rows. ``rows`` is an
+    optional ``(start, stop)`` range of data rows to parse, ``stop`` may be None.
+    """
+    if rows is not None:
+        start, stop = rows
+        with feed.open(name) as member:
+            names = pd.read_csv(member, nrows=0, delimiter=kwargs.get('delimiter', ',')).columns
+        # skiprows counts the blank records skipped by the parser, nrows does not
+        kwargs.update(header=None, names=names, skiprows=_row_record(feed, name, start),
+                      nrows=None if stop is None else stop - start)
+    with feed.open(name) as member:
+        if chunk_size is None:
+            yield pd.read_csv(member, **kwargs)
+        else:
+            with pd.read_csv(member, chunksize=chunk_size, **kwargs) as reader:
+                yield from reader
+
+
+def _read_table(feed: ZipFile, name: str, chunk_size: int = None, rows: tuple = None, cache: str = None, **kwargs):
+    """Parse a GTFS table, whole or in chunks, see ``_read_chunks``.
+
+    Unless ``dtype`` is given, columns are parsed with the dtypes of
+    ``_GTFS_SCHEMA``, and the columns it does not list as strings, so that every
+    chunk renders as the whole table would. With a ``cache`` directory the table
+    is read from there, see ``_read_cached``.
+    """
+    if cache is not None:
+        return _read_cached(feed, name, cache, chunk_size, rows, kwargs.get('usecols'))
+    if kwargs.get('dtype') is None:
+        kwargs['dtype'] = defaultdict(lambda: str, _GTFS_SCHEMA[name])
+    return _read_chunks(feed, name, chunk_size, rows, **kwargs)
+
+
+def _feed_hash(file_path: str):
+    """SHA-256 of the content of a feed archive, the key of its parsed tables in the cache."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_table(feed: ZipFile, name: str, cache: str, chunk_size: int = 1 << 20):
+    """Parse a GTFS table into the ``cache`` directory of its feed, unless it is there already.
+
+    A table is a directory with a ``table.json`` of its rows and columns and a raw file per column, with the
+    values of numeric columns or the int32 codes of the others, which keep their categories in a
+    ``<column>.categories.npy`` array of strings. Columns outside ``_GTFS_SCHEMA`` are kept as strings. The
+    table is parsed ``chunk_size`` rows at a time, written aside and renamed into place, so that workers
+    filling the same cache never see a partial table.
+    """
+    target = cache + os.sep + name[:-len('.txt')]
+    if os.path.exists(target):
+        return
+    os.makedirs(cache, exist_ok=True)
+    temporary = tempfile.mkdtemp(dir=cache)
+    columns, files, lookups, rows = None, [], [], 0
+    try:
+        for chunk in _read_chunks(feed, name, chunk_size, dtype=defaultdict(lambda: str, _GTFS_SCHEMA[name])):
+            if columns is None:
+                columns = [{'name': column, 'dtype': 'category' if chunk[column].dtype.kind not in 'iufb'
+                            else chunk[column].dtype.str} for column in chunk.columns]
+                files = [open(temporary + os.sep + '%d.bin' % i, 'wb') for i in range(len(columns))]
+                lookups = [dict() for _ in columns]
+            for i, column in enumerate(columns):
+                values = chunk[column['name']]
+                if column['dtype'] != 'category':
+                    values.to_numpy(dtype=column['dtype']).tofile(files[i])
+                    continue
+                # codes of a dictionary shared by the whole table, so that its chunks concatenate as categoricals
+                codes, uniques = pd.factorize(values)
+                lookup = lookups[i]
+                mapping = np.fromiter((lookup.setdefault(value, len(lookup)) for value in uniques.tolist()),
+                                      dtype=np.int32, count=len(uniques))
+                np.where(codes < 0, -1, mapping[codes] if len(mapping) else codes).astype(np.int32).tofile(files[i])
+            rows += len(chunk)
+        for i, f in enumerate(files):
+            f.close()
+            if columns[i]['dtype'] == 'category':
+                np.save(temporary + os.sep + '%d.categories.npy' % i, np.array(list(lookups[i]), dtype=str))
+        with open(temporary + os.sep + 'table.json', 'w+') as f:
+            json.dump({'rows': rows, 'columns': columns or []}, f)
+    except BaseException:
+        for f in files:
+            f.close()
+        shutil.rmtree(temporary)
+        raise
+    try:
+        os.rename(temporary, target)
+    except OSError:
+        # filled by another worker meanwhile
+        shutil.rmtree(temporary)
+
+
+def _read_cached(feed: ZipFile, name: str, cache: str, chunk_size: int = None, rows: tuple = None,
+                 usecols: list = None):
+    """Read a GTFS table from the ``cache`` directory of its feed, filling it first if needed.
+
+    Chunks and row ranges are as in ``_read_chunks``, ``usecols`` selects columns. The column files are memory
+    mapped, only the rows of the current chunk are loaded, and the categorical columns share their categories
+    across the chunks.
+    """
+    _cache_table(feed, name, cache)
+    directory = cache + os.sep + name[:-len('.txt')]
+    with open(directory + os.sep + 'table.json') as f:
+        table = json.load(f)
+    columns = []
+    for i, column in enumerate(table['columns']):
+        if usecols is not None and column['name'] not in usecols:
+            continue
+        path = directory + os.sep + '%d.bin' % i
+        dtype = np.int32 if column['dtype'] == 'category' else np.dtype(column['dtype'])
+        values = np.memmap(path, dtype=dtype, mode='r') if os.path.getsize(path) else np.empty(0, dtype=dtype)
+        categories = pd.Index(np.load(directory + os.sep + '%d.categories.npy' % i).astype(object)) \
+            if column['dtype'] == 'category' else None
+        columns.append((column['name'], values, categories))
+
+    start, stop = rows if rows is not None else (0, None)
+    stop = table['rows'] if stop is None else min(stop, table['rows'])
+    step = max(stop - start, 1) if chunk_size is None else chunk_size
+    for first in range(start, max(stop, start + 1) if chunk_size is None else stop, step):
+        last = min(first + step, stop)
+        yield pd.DataFrame({column: np.array(values[first:last]) if categories is None else
+                            pd.Categorical.from_codes(np.array(values[first:last]), categories=categories)
+                            for column, values, categories in columns})
+
+
+def _blank_records(feed: ZipFile, name: str, block_size: int = 1 << 20):
+    """Scan the records of a GTFS table without parsing it, yielding for each block whether its records are blank.
+
+    Records end at the line breaks outside double quotes, as the parser splits them, and the blank ones (only
+    spaces, tabs or carriage returns) are skipped by the parser without being numbered as rows.
+    """
+    # whether the record left unfinished by the previous blocks is inside quotes, is not blank, has any byte
+    quoted, filled, pending = False, False, False
+    with feed.open(name) as member:
+        for block in iter(lambda: member.read(block_size), b''):
+            data = np.frombuffer(block, dtype=np.uint8)
+            ends = np.flatnonzero(data == ord('\n'))
+            if quoted or b'"' in block:
+                # only the parity of the quotes matters, which a wrapping count keeps
+                quotes = np.cumsum(data == ord('"'), dtype=np.uint8) + np.uint8(quoted)
+                ends = ends[quotes[ends] % 2 == 0]
+                quoted = bool(quotes[-1] % 2)
+            if not len(ends):
+                filled = filled or bool(block.strip(b' \t\r\n'))
+                pending = True
+                continue
+            starts = np.concatenate(([0], ends[:-1] + 1))
+            # a blank record starts with whitespace, few other records do
+            first = data[starts]
+            blank = (first == ord(' ')) | (first == ord('\t')) | (first == ord('\r')) | (first == ord('\n'))
+            for record in np.flatnonzero(blank):
+                blank[record] = not block[starts[record]:ends[record]].strip(b' \t\r')
+            blank[0] &= not filled
+            tail = block[ends[-1] + 1:]
+            filled, pending = bool(tail.strip(b' \t\r\n')), bool(tail)
+            yield blank
+    if pending:
+        # a last record without line break
+        yield np.array([not filled])
+
+
+def _count_rows(feed: ZipFile, name: str):
+    """Count the data rows of a GTFS table, as the parser numbers them, without parsing it."""
+    return max(sum(int(np.count_nonzero(~blank)) for blank in _blank_records(feed, name)) - 1, 0)
+
+
+def _row_record(feed: ZipFile, name: str, row: int):
+    """The index of the record holding data row ``row`` of a GTFS table, the ``skiprows`` starting a parse there.
+
+    Past the last row, it is the number of records of the table.
+    """
+    # the data row of the last record that is not blank, the first one being the header
+    rows, records = -1, 0
+    for blank in _blank_records(feed, name):
+        filled = np.flatnonzero(~blank)
+        if rows + len(filled) > row:
+            return records + int(filled[row - rows])
+        rows += len(filled)
+        records += len(blank)
+    return records
+
+
+def _shard_rows(feed: ZipFile, name: str, shards: int):
+    """Split the data rows of a GTFS table into at most ``shards`` consecutive ``(start, stop)`` ranges.
+
+    The last range is open ended, so rows miscounted by ``_count_rows`` (for
+    example a stray double quote) still end up in exactly one shard.
+    """
+    count = _count_rows(feed, name)
+    size = max(-(-count // shards), 1)
+    starts = range(0, max(count, 1), size)
+    return [(start, start + size) for start in starts[:-1]] + [(starts[-1], None)]
+
+
+def _shapes_frame(points, precision: int = None):
+    """One row per shape, in order of first appearance, with its "lon lat" points joined by ", ".
+
+    ``points`` are the shape points gathered by ``Converter._collect_shapes``, they are ordered by
+    shape_pt_sequence. With ``precision`` the coordinates are rounded to that many decimals and the
+    consecutive points of a shape that become equal are dropped.
+    """
+    codes, shape_id = pd.factorize(points['shape_id'], use_na_sentinel=False)
+    if len(codes) == 0:
+        return pd.DataFrame({'shape_id': [], 'shape_points': []}, dtype=object)
+    # a single stable sort groups the points by shape (codes follow the first appearance) and orders them
+    order = np.lexsort((points['shape_pt_sequence'].to_numpy(), codes))
+    codes = codes[order]
+    lon = points['shape_pt_lon'].to_numpy()[order]
+    lat = points['shape_pt_lat'].to_numpy()[order]
+    if precision is not None:
+        lon, lat = lon.round(precision), lat.round(precision)
+        kept = np.ones(len(codes), dtype=bool)
+        kept[1:] = (codes[1:] != codes[:-1]) | (lon[1:] != lon[:-1]) | (lat[1:] != lat[:-1])
+        codes, lon, lat = codes[kept], lon[kept], lat[kept]
+    text = (lon.astype(str).astype(object) + " " + lat.astype(str).astype(object)).tolist()
+    bounds = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts, stops = np.r_[0, bounds], np.r_[bounds, len(codes)]
+    return pd.DataFrame({'shape_id': np.asarray(shape_id, dtype=object)[codes[starts]],
+                         'shape_points': [", ".join(text[start:stop]) for start, stop in zip(starts, stops)]},
+                        dtype=object)
+
+
+def _call_with_feed(function, file_path, *args):
+    """Open the feed archive, in a worker process, and call ``function(feed, *args)``."""
+    with ZipFile(file_path, 'r') as feed:
+        return function(feed, *args)
+
+
+def _shard_path(path: str, rows: tuple = None):
+    """The file a row-range shard of an output is written to before the shards are concatenated."""
+    return path if rows is None else "%s.%d.part" % (path, rows[0])
+
+
+def _unmatched_rows(table, other, key: list):
+    """Mask of the rows of ``table`` whose primary ``key`` and ``_row_hash`` are not both found in ``other``."""
+    if other is None:
+        return np.ones(len(table), dtype=bool)
+    index = pd.MultiIndex.from_frame(table[key + ['_row_hash']])
+    return ~index.isin(pd.MultiIndex.from_frame(other[key + ['_row_hash']]))
+
+
+def _delta_path(path: str, kind: str):
+    """The file receiving the ``kind`` ('added' or 'removed') triples of an output in the incremental conversion."""
+    root, extension = os.path.splitext(path)
+    return root + '.' + kind + extension
+
+
+def _unique_ids(feed: ZipFile, name: str, column: str, cache: str = None):
+    """The distinct values of one column of a GTFS table, rendered as in the triples."""
+    return pd.unique(_str_column(next(_read_table(feed, name, cache=cache, usecols=[column]))[column]))
+
+
+def _agency_ids(agency, entry_name: str):
+    """The agency_id of every row of agency.txt, rendered as in the triples.
+
+    A feed with a single agency may leave agency_id out, its agency is then
+    identified by the entry name.
+    """
+    if 'agency_id' not in agency:
+        return np.full(len(agency), entry_name, dtype=object)
+    agency_id = _str_column(agency['agency_id'])
+    agency_id[agency['agency_id'].isna().to_numpy()] = entry_name
+    return agency_id
+
+
+def _declared(terms, declared: set):
+    """Mask of the ``terms`` already in ``declared`` or repeated earlier in ``terms``; the others are added to it."""
+    terms = pd.Series(terms, dtype=object)
+    seen = (terms.duplicated() | terms.isin(declared)).to_numpy()
+    declared.update(terms[~seen].tolist())
+    return seen
+
+
+def _escape_quotes(values):
+    """Escape double quotes in an object array of strings for use inside a literal."""
+    return np.array([value.replace('"', r'\"') for value in values.tolist()], dtype=object)
+
+
+def _blocks(table, block_rows: int = _WRITE_BLOCK_ROWS):
+    """Consecutive slices of at most ``block_rows`` rows of a table, rendered and written one at a time."""
+    for start in range(0, len(table), block_rows):
+        yield getattr(table, "iloc", table)[start:start + block_rows]
+
+
+def _write_rows(f, pieces):
+    """Write the triples of a block of rows column by column.
+
+    ``pieces`` is the template of one row: each item is either a literal string
+    shared by every row or an object array with one string per row. The text of
+    a row is the concatenation of its pieces, rows are written in order with a
+    single ``f.write``, so callers pass the slices of ``_blocks``.
+    """
+    merged = []
+    for piece in pieces:
+        if isinstance(piece, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += piece
+        else:
+            merged.append(piece)
+    rows = max((len(piece) for piece in merged if not isinstance(piece, str)), default=0)
+    if rows == 0:
+        return
+    block = np.empty((rows, len(merged)), dtype=object)
+    for i, piece in enumerate(merged):
+        block[:, i] = piece
+    # row-major ravel interleaves the pieces back into row order
+    f.write("".join(block.ravel().tolist()))
+
+
+def _peak_rss():
+    """Peak resident memory of the current process in bytes, None where it cannot be read."""
+    if resource is None:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+class _StageOutput:
+    """Output stream of one conversion stage that records what the stage does.
+
+    The rows of the chunks passed through ``read``, the triples written, the bytes of the output once closed,
+    the wall and CPU time since the stream was opened and the peak memory of the process are kept in
+    ``report``. A progress line is printed every ``_PROGRESS_SECONDS`` while the stage runs. With the
+    ``progress`` saved by a previous run, the stage resumes its unfinished output from there.
+    """
+
+    def __init__(self, stage: str, sink, path: str, progress: dict = None):
+        self._output = sink.open(path) if progress is None else sink.open(path, progress['offset'])
+        self._sink = sink
+        self._path = path
+        self._start = self._progress = time.perf_counter()
+        self._cpu = time.process_time()
+        self.report = {'stage': stage, 'rows': 0, 'triples': 0}
+        # wall and CPU time of the previous runs, an output with a saved progress is kept when the stage fails
+        self._previous = (0.0, 0.0)
+        self._resumable = progress is not None
+        if progress is not None:
+            self.report.update(rows=progress['rows'], triples=progress['triples'])
+            self._previous = (progress['wall_seconds'], progress['cpu_seconds'])
+
+    def read(self, chunks):
+        for chunk in chunks:
+            self.report['rows'] += len(chunk)
+            yield chunk
+
+    def write(self, text: str):
+        # one triple per line, the rows are separated by a blank line
+        self.report['triples'] += text.count('\n') - text.count('\n\n')
+        self._output.write(text)
+        now = time.perf_counter()
+        if now - self._progress >= _PROGRESS_SECONDS:
+            self._progress = now
+            print("  %s: %d rows, %d triples, %.0f triples/s" % (
+                self.report['stage'], self.report['rows'], self.report['triples'],
+                self.report['triples'] / (self._previous[0] + now - self._start)))
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def progress(self):
+        """Make the output written so far durable and return the progress a later run can resume it from.
+
+        That is the rows and triples so far, the wall and CPU time spent on them and the ``offset`` of the output
+        returned by its ``mark``.
+        """
+        self._resumable = True
+        return dict(self.report, offset=self._output.mark(),
+                    wall_seconds=self._previous[0] + time.perf_counter() - self._start,
+                    cpu_seconds=self._previous[1] + time.process_time() - self._cpu)
+
+    def close(self):
+        self._output.close()
+        self.report['wall_seconds'] = self._previous[0] + time.perf_counter() - self._start
+        self.report['cpu_seconds'] = self._previous[1] + time.process_time() - self._cpu
+        self.report['triples_per_second'] = self.report['triples'] / self.report['wall_seconds'] \
+            if self.report['wall_seconds'] else None
+        self.report['bytes'] = self._sink.size(self._path)
+        self.report['peak_rss_bytes'] = _peak_rss()
+
+    def discard(self):
+        if self._resumable:
+            # left unfinished for a rerun, which truncates it to its last progress
+            self._output.suspend()
+        else:
+            getattr(self._output, 'discard', self._output.close)()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def _merge_reports(reports: list):
+    """Report of a stage whose row-range shards ran side by side, from the reports of the shards."""
+    merged = dict(reports[0], shards=len(reports))
+    for field in ('rows', 'triples', 'bytes', 'cpu_seconds'):
+        merged[field] = sum(report[field] for report in reports)
+    merged['wall_seconds'] = max(report['wall_seconds'] for report in reports)
+    merged['triples_per_second'] = merged['triples'] / merged['wall_seconds'] if merged['wall_seconds'] else None
+    peak_rss = [report['peak_rss_bytes'] for report in reports if report['peak_rss_bytes'] is not None]
+    merged['peak_rss_bytes'] = max(peak_rss, default=None)
+    return merged
+
+
+class _Checkpoint:
+    """Progress of a conversion, saved to ``path`` after every step so that a rerun resumes where it stopped.
+
+    It keeps the reports of the completed stages, for the stages written in row-range parts the reports of
+    their completed parts by first row, and for the stages written in chunks the progress of their output
+    after the last completed chunk. A saved progress is used only by a rerun with the same ``key``, made of the
+    feed content hash and of the options the outputs depend on.
+    """
+
+    def __init__(self, path: str, key: dict):
+        self._path = path
+        self._progress = {'key': key, 'stages': dict(), 'parts': dict(), 'chunks': dict()}
+        if os.path.exists(path):
+            with open(path) as f:
+                progress = json.load(f)
+            if progress['key'] == key:
+                self._progress = progress
+
+    def stage(self, stage: str):
+        """The report of ``stage`` if a previous run completed it, None otherwise."""
+        return self._progress['stages'].get(stage)
+
+    def complete(self, stage: str, report: dict):
+        self._progress['stages'][stage] = report
+        self._progress['parts'].pop(stage, None)
+        self._progress['chunks'].pop(stage, None)
+        self._save()
+
+    def parts(self, stage: str):
+        """The reports of the completed parts of ``stage``, by first row."""
+        return {int(start): report for start, report in self._progress['parts'].get(stage, {}).items()}
+
+    def complete_part(self, stage: str, start: int, report: dict):
+        self._progress['parts'].setdefault(stage, dict())[str(start)] = report
+        self._save()
+
+    def progress(self, stage: str):
+        """The progress of the output of ``stage`` after its last completed chunk, see ``_StageOutput.progress``."""
+        return self._progress['chunks'].get(stage)
+
+    def complete_chunk(self, stage: str, progress: dict):
+        self._progress['chunks'][stage] = progress
+        self._save()
+
+    def _save(self):
+        with open(self._path + '.tmp', 'w+') as f:
+            json.dump(self._progress, f)
+        os.replace(self._path + '.tmp', self._path)
+
+    def remove(self):
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+
+# marker starting every segment of the binary output format, its first byte is the reserved term code 1
+_BINARY_MAGIC = b'\x01GTFSN3B'
+# terms of a binary segment dictionary before the writer starts a new segment
+_BINARY_SEGMENT_TERMS = 1 << 20
+# greedy object ending on a non-space, a lazy one backtracks at every character
+_TRIPLE = re.compile(r'\s*(<[^>]*>)\s*(<[^>]*>)\s*(.*\S)\s*\.\s*$')
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class _BinaryTriplesWriter:
+    """Text stream encoding the N-Triples lines written to it in the binary output format.
+
+    A file is a sequence of segments, each made of ``_BINARY_MAGIC`` and of triples with a term dictionary
+    shared by the triples of the segment. A triple is three varint term codes: 0 adds a new term to the
+    dictionary, followed by varint(length of the prefix shared with the previous new term),
+    varint(suffix length) and the utf-8 suffix; n >= 2 refers to the dictionary term n - 2. Segments are
+    started again every ``_BINARY_SEGMENT_TERMS`` terms to bound memory, and concatenated files remain
+    valid. ``read_binary_triples`` decodes them. With ``append`` a new segment is added to the file.
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        self._file = open(path, 'ab' if append else 'wb')
+        self._pending = ''
+        self._terms = dict()
+        self._last_term = b''
+        self._file.write(_BINARY_MAGIC)
+
+    def write(self, text: str):
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        self._encode(lines)
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def _encode(self, lines):
+        out = bytearray()
+        terms = self._terms
+        for line in lines:
+            triple = _TRIPLE.match(line)
+            if triple is None:
+                continue
+            if len(terms) >= _BINARY_SEGMENT_TERMS:
+                out += _BINARY_MAGIC
+                terms.clear()
+                self._last_term = b''
+            for term in triple.groups():
+                code = terms.get(term)
+                if code is not None:
+                    _write_varint(out, code)
+                    continue
+                terms[term] = len(terms) + 2
+                encoded = term.encode('utf-8')
+                shared = len(os.path.commonprefix((self._last_term, encoded)))
+                out.append(0)
+                _write_varint(out, shared)
+                _write_varint(out, len(encoded) - shared)
+                out += encoded[shared:]
+                self._last_term = encoded
+        self._file.write(out)
+
+    def close(self):
+        self._encode([self._pending])
+        self._pending = ''
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_binary_triples(path: str):
+    """Yield the (subject, predicate, object) terms of a file written in the binary output format."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position, terms, last_term, triple = 0, [], b'', []
+
+            def varint():
+                nonlocal position
+                value, shift = 0, 0
+                while True:
+                    byte = data[position]
+                    position += 1
+                    value |= (byte & 0x7f) << shift
+                    if byte < 0x80:
+                        return value
+                    shift += 7
+
+            while position < len(data):
+                if not triple and data[position:position + len(_BINARY_MAGIC)] == _BINARY_MAGIC:
+                    position += len(_BINARY_MAGIC)
+                    terms, last_term = [], b''
+                    continue
+                code = varint()
+                if code == 0:
+                    shared = varint()
+                    length = varint()
+                    last_term = last_term[:shared] + data[position:position + length]
+                    position += length
+                    terms.append(last_term.decode('utf-8'))
+                    triple.append(terms[-1])
+                else:
+                    triple.append(terms[code - 2])
+                if len(triple) == 3:
+                    yield tuple(triple)
+                    triple = []
+
+
+class _AtomicOutput:
+    """Text stream writing to a ``temporary`` file that replaces the file ``path`` when it is closed.
+
+    A stream left by an error is discarded instead, so that ``path`` is either complete or as before.
+    ``open_stream(append)`` opens the text stream on the temporary file. ``mark`` ends the stream where the
+    temporary file is valid, and its offset lets a later stream truncate the file there and append to it.
+    """
+
+    def __init__(self, open_stream, temporary: str, path: str, offset: int = None):
+        if offset is not None:
+            os.truncate(temporary, offset)
+        self._open_stream = open_stream
+        self._stream = open_stream(offset is not None)
+        self._temporary = temporary
+        self._path = path
+
+    def write(self, text: str):
+        return self._stream.write(text)
+
+    def writelines(self, lines):
+        self._stream.writelines(lines)
+
+    def mark(self):
+        # gzip members, zstd frames and binary segments end with the stream, and the next stream appends new ones
+        self._stream.close()
+        offset = os.path.getsize(self._temporary)
+        self._stream = self._open_stream(True)
+        return offset
+
+    def close(self):
+        self._stream.close()
+        os.replace(self._temporary, self._path)
+
+    def discard(self):
+        self._stream.close()
+        os.remove(self._temporary)
+
+    def suspend(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class FileSink:
+    """Sink writing every output to a file, in one of the output formats.
+
+    A sink opens a text stream receiving the N-Triples lines of each output, named by the path of its .n3 file,
+    and joins the row-range shards of an output written side by side. The stream is closed once the output is
+    complete, or discarded. Its ``mark`` returns an offset of the output written so far, from which ``open``
+    resumes it after a ``suspend``. ``Converter`` accepts any object with the methods of this class.
+    """
+
+    # suffix appended to the .n3 file names by every output format
+    formats = {
+        'n3': '',
+        'gzip': '.gz',
+        'zstd': '.zst',
+        'binary': '.bin',
+    }
+
+    def __init__(self, output_format: str = 'n3'):
+        if output_format not in self.formats:
+            raise ValueError("Unknown output format %s, use one of %s" % (output_format, ', '.join(self.formats)))
+        self.output_format = output_format
+
+    def file(self, path: str):
+        """The name of the output file ``path`` (a .n3 name) in the output format."""
+        return path + self.formats[self.output_format]
+
+    def open(self, path: str, offset: int = None):
+        """Open the output file ``path`` (a .n3 name) as a text stream encoding the triples in the output format.
+
+        The triples go to a temporary file that replaces the output file once the stream is closed, see
+        ``_AtomicOutput``. With an ``offset`` the temporary file left unfinished by a previous stream is truncated
+        there and the triples are appended to it.
+        """
+        temporary = self.file(path) + '.tmp'
+        return _AtomicOutput(partial(self._open_stream, temporary), temporary, self.file(path), offset)
+
+    def _open_stream(self, temporary: str, append: bool = False):
+        mode = 'a' if append else 'w'
+        if self.output_format == 'gzip':
+            return gzip.open(temporary, mode + 't', encoding='utf-8', compresslevel=6)
+        if self.output_format == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("The zstd output format needs the zstandard module: pip install zstandard")
+            return zstandard.open(temporary, mode + 't', encoding='utf-8')
+        if self.output_format == 'binary':
+            return _BinaryTriplesWriter(temporary, append)
+        return open(temporary, mode)
+
+    def resumable(self, path: str, offset: int):
+        """Whether the output ``path`` left unfinished can be opened again from ``offset``."""
+        temporary = self.file(path) + '.tmp'
+        return os.path.exists(temporary) and os.path.getsize(temporary) >= offset
+
+    def size(self, path: str):
+        """Bytes of the output ``path`` once closed."""
+        return os.path.getsize(self.file(path))
+
+    def join(self, path: str, parts: list):
+        """Replace the output ``path`` by the concatenation of the outputs ``parts``, in order.
+
+        The parts are removed once the output is replaced, so a join stopped while removing them only removes the
+        remaining ones when it is run again.
+        """
+        remaining = [part for part in parts if os.path.exists(self.file(part))]
+        if len(remaining) == len(parts):
+            # gzip members, zstd frames and binary segments all stay valid when concatenated
+            with open(self.file(path) + '.tmp', 'wb') as f:
+                for part in parts:
+                    with open(self.file(part), 'rb') as part_file:
+                        shutil.copyfileobj(part_file, f)
+            os.replace(self.file(path) + '.tmp', self.file(path))
+        for part in remaining:
+            os.remove(self.file(part))
+
+
+class SQLiteSink:
+    """Sink bulk loading the triples in the quad table of an SQLite database, one named graph per output.
+
+    The graph of an output is the name of its .n3 file. Terms are stored in their N-Triples form. Triples are
+    inserted ``batch_triples`` at a time, a transaction per batch, with a connection opened once per process and
+    reused by every output. They are loaded in a staging table, which replaces the triples of the graph when the
+    output is closed, so that a graph is either complete or as before.
+    """
+
+    def __init__(self, database: str, batch_triples: int = 500000):
+        self.database = os.path.abspath(database)
+        self.batch_triples = batch_triples
+        self._connection = None
+        self._sizes = dict()
+
+    def __getstate__(self):
+        # worker processes open their own connection
+        return dict(self.__dict__, _connection=None)
+
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.database, timeout=600)
+            # shards of the parallel conversion load side by side
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            with self._connection:
+                self._connection.execute("CREATE TABLE IF NOT EXISTS quads "
+                                         "(graph TEXT NOT NULL, subject TEXT NOT NULL, predicate TEXT NOT NULL, "
+                                         "object TEXT NOT NULL)")
+                self._connection.execute("CREATE INDEX IF NOT EXISTS quads_graph ON quads (graph)")
+        return self._connection
+
+    def open(self, path: str, offset: list = None):
+        """Open the output ``path`` as a text stream loading its graph.
+
+        With an ``offset``, the [triples, bytes] returned by the ``mark`` of a previous stream, the staging table
+        it left is kept up to there and the triples are appended to it.
+        """
+        graph = os.path.basename(path)
+        staging = _staging_table(graph)
+        with self.connection() as connection:
+            if offset is None:
+                # a staging table may be left by a failed run
+                connection.execute("DROP TABLE IF EXISTS %s" % staging)
+                connection.execute("CREATE TABLE %s (subject TEXT NOT NULL, predicate TEXT NOT NULL, "
+                                   "object TEXT NOT NULL)" % staging)
+            else:
+                # rows are numbered in insertion order
+                connection.execute("DELETE FROM %s WHERE rowid > ?" % staging, (offset[0],))
+        self._sizes[graph] = 0 if offset is None else offset[1]
+        return _SQLiteTriplesWriter(self, graph)
+
+    def resumable(self, path: str, offset: list):
+        """Whether the output ``path`` left unfinished can be opened again from ``offset``."""
+        staging = _staging_table(os.path.basename(path))
+        try:
+            loaded = self.connection().execute("SELECT max(rowid) FROM %s" % staging).fetchone()[0]
+        except sqlite3.OperationalError:
+            # no such table
+            return False
+        return (loaded or 0) >= offset[0]
+
+    def size(self, path: str):
+        """Bytes of the N-Triples text loaded in the graph of the output ``path`` by this process."""
+        return self._sizes[os.path.basename(path)]
+
+    def join(self, path: str, parts: list):
+        graph = os.path.basename(path)
+        with self.connection() as connection:
+            connection.execute("DELETE FROM quads WHERE graph = ?", (graph,))
+            connection.executemany("UPDATE quads SET graph = ? WHERE graph = ?",
+                                   [(graph, os.path.basename(part)) for part in parts])
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def _staging_table(graph: str):
+    """The quoted name of the table loading the triples of ``graph`` in an ``SQLiteSink``."""
+    return '"staging:%s"' % graph.replace('"', '""')
+
+
+class _SQLiteTriplesWriter:
+    """Text stream inserting the N-Triples lines written to it in one graph of an ``SQLiteSink``.
+
+    The triples go to the staging table of the graph, which replaces the graph in a single transaction when the
+    stream is closed. A stream left by an error drops its staging table instead.
+    """
+
+    def __init__(self, sink: SQLiteSink, graph: str):
+        self._sink = sink
+        self._graph = graph
+        self._staging = _staging_table(graph)
+        self._pending = ''
+        self._batch = []
+
+    def write(self, text: str):
+        self._sink._sizes[self._graph] += len(text.encode('utf-8'))
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        self._insert(lines)
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def _insert(self, lines, flush: bool = False):
+        self._batch += [triple.groups() for triple in map(_TRIPLE.match, lines) if triple is not None]
+        if len(self._batch) >= self._sink.batch_triples or flush and self._batch:
+            with self._sink.connection() as connection:
+                connection.executemany("INSERT INTO %s VALUES (?, ?, ?)" % self._staging, self._batch)
+            self._batch = []
+
+    def mark(self):
+        # the triples and bytes loaded so far, the pending line is empty between two rows
+        self._insert([], flush=True)
+        loaded = self._sink.connection().execute("SELECT max(rowid) FROM %s" % self._staging).fetchone()[0]
+        return [loaded or 0, self._sink._sizes[self._graph]]
+
+    def close(self):
+        self._insert([self._pending], flush=True)
+        self._pending = ''
+        with self._sink.connection() as connection:
+            connection.execute("DELETE FROM quads WHERE graph = ?", (self._graph,))
+            connection.execute("INSERT INTO quads SELECT ?, subject, predicate, object FROM %s ORDER BY rowid"
+                               % self._staging, (self._graph,))
+            connection.execute("DROP TABLE %s" % self._staging)
+
+    def discard(self):
+        self._batch = []
+        self._pending = ''
+        with self._sink.connection() as connection:
+            connection.execute("DROP TABLE IF EXISTS %s" % self._staging)
+
+    def suspend(self):
+        # the staging table is kept for a later stream, which deletes what was loaded after the last mark
+        self._batch = []
+        self._pending = ''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
 
-import json, sys
 
- 
 class Converter:
 
     _route_type = {
@@ -35,17 +956,39 @@ class Converter:
         7: "<http://vocab.gtfs.org/terms#Funicular>"
     }
 
-    def __init__(self, output_dir: str = None):
+    # GTFS tables of the incremental conversion: output file, writer, primary key and the triples owned by each row,
+    # as the subject type and the only predicate (None for any); the other triples are shared with other tables
+    _incremental_tables = (
+        ('agency.txt', 'agency.n3', '_write_agencies', ['agency_id'], '_Agency_', None),
+        ('calendar_dates.txt', 'calendar_dates.n3', '_write_calendar_dates', ['service_id', 'date'], '_Service_',
+         '<http://purl.org/dc/terms/date>'),
+        ('stops.txt', 'stops.n3', '_write_stops', ['stop_id'], '_Stop_', None),
+        ('stop_times.txt', 'StopTimes.n3', '_write_stop_times', ['trip_id', 'stop_sequence'], '_StopTime_', None),
+        ('trips.txt', 'trips.n3', '_write_trips', ['trip_id'], '_Trip_', None),
+        ('shapes.txt', 'shapes.n3', '_write_shapes', ['shape_id'], '_Shape_', None),
+        ('routes.txt', 'routes.n3', '_write_routes', ['route_id'], '_Route_', None),
+    )
+
+    def __init__(self, output_dir: str = None, output_format: str = 'n3', sink=None, cache_dir: str = None):
         if output_dir is None:
             output_dir = os.getcwd() + os.sep + 'output'
         else:
             output_dir = os.path.abspath(output_dir)
         os.makedirs(output_dir, exist_ok=True)
         self.output_directory = output_dir
+        # the triples go to the files of the output directory, or to a triples.sqlite database there
+        if sink is None:
+            sink = SQLiteSink(output_dir + os.sep + 'triples.sqlite') if output_format == 'sqlite' else \
+                FileSink(output_format)
+        self.sink = sink
+        self.output_format = output_format
+        # parsed tables of every feed are kept in cache_dir/<content hash>, see _cache_table
+        self.cache_directory = None if cache_dir is None else os.path.abspath(cache_dir)
+        self._feed_cache = None
     
     def __str__(self):
-        return """Output directory: %s""" \
-               % (self.output_directory)
+        return """Output directory: %s, output format: %s, cache directory: %s""" \
+               % (self.output_directory, self.output_format, self.cache_directory)
 
     def set_output_directory(self, output_dir: str = None):
         if output_dir is None:
@@ -53,288 +996,646 @@ class Converter:
         else:
             output_dir = os.path.abspath(output_dir)
         os.makedirs(output_dir, exist_ok=True)
+        if isinstance(self.sink, SQLiteSink) and \
+                self.sink.database == self.output_directory + os.sep + 'triples.sqlite':
+            # the triples.sqlite database of the output directory moves with it, a sink given to __init__ stays
+            self.sink.close()
+            self.sink = SQLiteSink(output_dir + os.sep + 'triples.sqlite', self.sink.batch_triples)
         self.output_directory = output_dir
 
-    def _extract_agencies_triples(self, entry_name):
-        agency = pd.read_csv(self.output_directory + os.sep + 'agency.txt', delimiter=',')
+    def _open_stage(self, stage: str, path: str, progress: dict = None):
+        """Open the output ``path`` (a .n3 name) of a conversion stage in the sink, recording its report.
+
+        With the ``progress`` of a previous run, its unfinished output is resumed, see ``_StageOutput``.
+        """
+        return _StageOutput(stage, self.sink, path, progress)
+
+    def _extract_agencies_triples(self, entry_name, feed: ZipFile, chunk_size: int = None):
         print("Write triples for agency")
-        f = open(self.output_directory + os.sep + "agency.n3", "w+")
-        for i in range(len(agency["agency_id"])):
+        with self._open_stage('agency', self.output_directory + os.sep + "agency.n3") as f:
+            for agency in f.read(_read_table(feed, 'agency.txt', chunk_size, cache=self._feed_cache,
+                                                delimiter=',')):
+                self._write_agencies(f, entry_name, agency)
+        return f.report
+
+    def _write_agencies(self, f, entry_name, agency):
+        for agency in _blocks(agency):
+            agency_id = _agency_ids(agency, entry_name)
             # semantic subject
-            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Agency_" + str(agency["agency_id"][i]) + \
-                         ">"
-
-            f.write(first_term + " <http://purl.org/dc/terms/identifier> " +
-                    '"' + entry_name + '_' + str(agency["agency_id"][i]) + '" .\n')
-            f.write(first_term + " <http://xmlns.com/foaf/0.1/name> " + '"' + str(agency["agency_name"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://vocab.gtfs.org/terms#timeZone> " + '"' + str(agency["agency_timezone"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://vocab.gtfs.org/terms#fareUrl> " + '"' + str(agency["agency_url"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://purl.org/dc/terms/language> " + '"' + str(agency["agency_lang"][i]) + '" .\n')
-            f.write(
-                first_term +
-                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Agency> . \n")
-            f.write("\n")
-        f.close()
-
-    def _extract_calendar_dates_triples(self, entry_name):
-        read_file = pd.read_csv(self.output_directory + os.sep + 'calendar_dates.txt')
-        read_file.to_csv(r'calendar_dates.csv', index=None)
-        calendar = pd.read_csv("calendar_dates.csv", delimiter=",")
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Agency_" + agency_id + ">"
+            _write_rows(f, [
+                first_term, " <http://purl.org/dc/terms/identifier> ",
+                '"' + entry_name + '_', agency_id, '" .\n',
+                first_term, " <http://xmlns.com/foaf/0.1/name> ",
+                '"', _str_column(agency["agency_name"]), '" .\n',
+                first_term, " <http://vocab.gtfs.org/terms#timeZone> ",
+                '"', _str_column(agency["agency_timezone"]), '" .\n',
+                first_term, " <http://vocab.gtfs.org/terms#fareUrl> ",
+                '"', _str_column(agency["agency_url"]), '" .\n',
+                first_term, " <http://purl.org/dc/terms/language> ",
+                '"', _str_column(agency["agency_lang"]), '" .\n',
+                first_term,
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Agency> . \n",
+                "\n",
+            ])
+
+    def _extract_calendar_dates_triples(self, entry_name, feed: ZipFile, chunk_size: int = None):
         print("Write triples for calendar_dates")
-        f = open(self.output_directory + os.sep + "calendar_dates.n3", "w+")
-        for i in range(len(calendar["service_id"])):
-            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Service_" + str(calendar["service_id"][i]) + ">"
-            date = str(calendar["date"][i])[0:4] + "-" + str(calendar["date"][i])[4:6] + "-" + str(calendar["date"][i])[6:8]
-
-            f.write(first_term + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + "_Service_" +
-                    str(calendar["service_id"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Service> .\n")
-            f.write(first_term + " <http://purl.org/dc/terms/date>" + '"' + date + '" .\n')
-            f.write("\n")
-        f.close()
-
-    def _extract_stop_triples(self, entry_name):
-        read_file = pd.read_csv(self.output_directory + os.sep + 'stops.txt')
-        read_file.to_csv(r'stops.csv', index=None)
-        stops = pd.read_csv("stops.csv", delimiter=",")
+        with self._open_stage('calendar_dates', self.output_directory + os.sep + "calendar_dates.n3") as f:
+            declared = set()
+            for calendar in f.read(_read_table(feed, 'calendar_dates.txt', chunk_size, cache=self._feed_cache,
+                                                  delimiter=",")):
+                self._write_calendar_dates(f, entry_name, calendar, declared)
+            # services defined only in calendar.txt are declared here too, each entity has a single owner file
+            service_id = _unique_ids(feed, 'trips.txt', 'service_id', self._feed_cache)
+            self._write_services(f, entry_name, service_id[~_declared(
+                "<http://www.disit.org/km4city/resource/" + entry_name + "_Service_" + service_id + ">", declared)])
+        return f.report
+
+    def _write_calendar_dates(self, f, entry_name, calendar, declared: set = None):
+        declared = set() if declared is None else declared
+        for calendar in _blocks(calendar):
+            service_id = _str_column(calendar["service_id"])
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Service_" + service_id + ">"
+            raw_date = pd.Series(_str_column(calendar["date"]))
+            date = _str_column(raw_date.str.slice(0, 4) + "-" + raw_date.str.slice(4, 6) + "-" +
+                               raw_date.str.slice(6, 8))
+            # identifier and type only with the first date of every service
+            declaration = np.full(len(service_id), "", dtype=object)
+            first = ~_declared(first_term, declared)
+            declaration[first] = \
+                first_term[first] + " <http://purl.org/dc/terms/identifier> " + \
+                '"' + entry_name + "_Service_" + service_id[first] + '" .\n' + \
+                first_term[first] + \
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Service> .\n"
+            _write_rows(f, [
+                declaration,
+                first_term, " <http://purl.org/dc/terms/date>" + '"', date, '" .\n',
+                "\n",
+            ])
+
+    def _write_services(self, f, entry_name, service_id):
+        for service_id in _blocks(service_id):
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Service_" + service_id + ">"
+            _write_rows(f, [
+                first_term, " <http://purl.org/dc/terms/identifier> ",
+                '"' + entry_name + "_Service_", service_id, '" .\n',
+                first_term,
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Service> .\n",
+                "\n",
+            ])
+
+    def _extract_stop_triples(self, entry_name, feed: ZipFile, chunk_size: int = None):
         print("Write triples for stops")
-        f = open(self.output_directory + os.sep + 'stops.n3', "w+")
-        for i in range(len(stops["stop_id"])):
-            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Stop_" + str(stops["stop_id"][i]) + ">"
-
-            f.write(first_term + " <http://www.w3.org/2003/01/geo/wgs84_pos#long> " + '"' + str(
-                stops["stop_lon"][i]) + '"^^<http://www.w3.org/2001/XMLSchema#float> .\n')
-            f.write(
-                first_term + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + "_Stop_" + str(stops["stop_id"][
-                    i]) + '" .\n')
-            f.write(first_term + " <http://vocab.gtfs.org/terms#code> " + '"' + str(stops["stop_code"][i]) + '" .\n')
-            f.write(first_term + " <http://www.w3.org/2003/01/geo/wgs84_pos#lat> " + '"' + str(
-                stops["stop_lat"][i]) + '"^^<http://www.w3.org/2001/XMLSchema#float> .\n')
-            f.write(
-                first_term + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Stop> .\n")
-            f.write(first_term + " <http://xmlns.com/foaf/0.1/name> " + '"' +
-                    str(stops["stop_name"][i]).replace('"', r'\"') + '" .\n')
-            f.write(
-                first_term + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.disit.org/km4city/schema#BusStop> .\n")
-            f.write("\n")
-        f.close()
-
-    def _extract_stop_times_triples(self, entry_name):
-        read_file = pd.read_csv(self.output_directory + os.sep + 'stop_times.txt')
-        read_file.to_csv(r'stop_times.csv', index=None)
-        stop_times = pd.read_csv("stop_times.csv", delimiter=",")
+        with self._open_stage('stops', self.output_directory + os.sep + 'stops.n3') as f:
+            for stops in f.read(_read_table(feed, 'stops.txt', chunk_size, cache=self._feed_cache, delimiter=",")):
+                self._write_stops(f, entry_name, stops)
+        return f.report
+
+    def _write_stops(self, f, entry_name, stops):
+        for stops in _blocks(stops):
+            stop_id = _str_column(stops["stop_id"])
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Stop_" + stop_id + ">"
+            _write_rows(f, [
+                first_term, " <http://www.w3.org/2003/01/geo/wgs84_pos#long> ",
+                '"', _str_column(stops["stop_lon"]), '"^^<http://www.w3.org/2001/XMLSchema#float> .\n',
+                first_term, " <http://purl.org/dc/terms/identifier> ",
+                '"' + entry_name + "_Stop_", stop_id, '" .\n',
+                first_term, " <http://vocab.gtfs.org/terms#code> ", '"', _str_column(stops["stop_code"]), '" .\n',
+                first_term, " <http://www.w3.org/2003/01/geo/wgs84_pos#lat> ",
+                '"', _str_column(stops["stop_lat"]), '"^^<http://www.w3.org/2001/XMLSchema#float> .\n',
+                first_term,
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Stop> .\n",
+                first_term, " <http://xmlns.com/foaf/0.1/name> ",
+                '"', _escape_quotes(_str_column(stops["stop_name"])), '" .\n',
+                first_term,
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.disit.org/km4city/schema#BusStop> .\n",
+                "\n",
+            ])
+
+    def _extract_stop_times_triples(self, entry_name, feed: ZipFile, chunk_size: int = None, rows: tuple = None):
         print("Write triples for stop_times")
-        f = open(self.output_directory + os.sep + 'StopTimes.n3', "w+")
-        for i in range(len(stop_times["trip_id"])):
-            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_StopTime_" + str(stop_times["trip_id"][
-                i]) + "_" + str(stop_times["stop_sequence"][i]) + "> "
-            first_term_var = "<http://www.disit.org/km4city/resource/" + entry_name + "_Trip_" + str(stop_times["trip_id"][
-                i]) + "> "
-            first_term_var2 = "<http://www.disit.org/km4city/resource/" + entry_name + "_Stop_" + str(stop_times["stop_id"][
-                i]) + ">"
-
-            f.write(first_term + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + "_StopTime_" +
-                    str(stop_times["trip_id"][i]) + "_" + str(stop_times["stop_sequence"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#StopTime> .\n")
-            f.write(
-                first_term_var + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Trip> .\n")
-            f.write(first_term + " <http://vocab.gtfs.org/terms#trip> " + first_term_var + " .\n")
-            f.write(first_term + " <http://vocab.gtfs.org/terms#departureTime> " + '"' + str(stop_times["departure_time"][
-                i]) + '" .\n')
-            f.write(
-                first_term + " <http://vocab.gtfs.org/terms#stop> <http://www.disit.org/km4city/resource/" + entry_name + "_Stop_" +
-                str(stop_times["stop_id"][i]) + "> .\n")
-            f.write(first_term + " <http://vocab.gtfs.org/terms#stopSequence> " + '"' + str(
-                stop_times["stop_sequence"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://vocab.gtfs.org/terms#arrivalTime> " + '"' + str(stop_times["arrival_time"][
-                    i]) + '" .\n')
-            f.write(first_term_var + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + "_Trip_" +
-                    str(stop_times["trip_id"][i]) + '" .\n')
-            f.write(
-                first_term_var2 + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Stop> .\n")
-            f.write(first_term_var2 + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + "_Stop_" +
-                    str(stop_times["stop_id"][i]) + '" .\n')
-            f.write("\n")
-        f.close()
-
-    def _extract_trips_triples(self, entry_name):
-        trips = pd.read_csv(self.output_directory + os.sep + "trips.txt", delimiter=",", low_memory=True)
+        with self._open_stage('stop_times', _shard_path(self.output_directory + os.sep + 'StopTimes.n3', rows)) as f:
+            for stop_times in f.read(_read_table(feed, 'stop_times.txt', chunk_size, rows, self._feed_cache,
+                                                       delimiter=",")):
+                self._write_stop_times(f, entry_name, stop_times)
+        return f.report
+
+    def _write_stop_times(self, f, entry_name, stop_times):
+        for stop_times in _blocks(stop_times):
+            trip_id = _str_column(stop_times["trip_id"])
+            stop_sequence = _str_column(stop_times["stop_sequence"])
+            stop_id = _str_column(stop_times["stop_id"])
+            stop_time_id = trip_id + "_" + stop_sequence
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_StopTime_" + stop_time_id + "> "
+            first_term_var = "<http://www.disit.org/km4city/resource/" + entry_name + "_Trip_" + trip_id + "> "
+            first_term_var2 = "<http://www.disit.org/km4city/resource/" + entry_name + "_Stop_" + stop_id + ">"
+            # type and identifier of the trip and of the stop are written by trips.n3 and stops.n3
+            _write_rows(f, [
+                first_term, " <http://purl.org/dc/terms/identifier> ",
+                '"' + entry_name + "_StopTime_", stop_time_id, '" .\n',
+                first_term,
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#StopTime> .\n",
+                first_term, " <http://vocab.gtfs.org/terms#trip> ", first_term_var, " .\n",
+                first_term, " <http://vocab.gtfs.org/terms#departureTime> ",
+                '"', _str_column(stop_times["departure_time"]), '" .\n',
+                first_term, " <http://vocab.gtfs.org/terms#stop> ", first_term_var2, " .\n",
+                first_term, " <http://vocab.gtfs.org/terms#stopSequence> ", '"', stop_sequence, '" .\n',
+                first_term, " <http://vocab.gtfs.org/terms#arrivalTime> ",
+                '"', _str_column(stop_times["arrival_time"]), '" .\n',
+                "\n",
+            ])
+
+    def _extract_trips_triples(self, entry_name, feed: ZipFile, chunk_size: int = None, rows: tuple = None):
         print("Write triples for trips")
-        f = open(self.output_directory + os.sep + "trips.n3", "w+")
-        for i in range(len(trips["route_id"])):
-            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Trip_" + str(trips["trip_id"][i]) + ">"
-            first_term_var = "<http://www.disit.org/km4city/resource/" + entry_name + "_Service_" + \
-                             str(trips["service_id"][
-                                 i]) + ">"
-            first_term_var2 = "<http://www.disit.org/km4city/resource/" + entry_name + "_Shape_" + str(
-                trips["shape_id"][i]) + ">"
-            first_term_var3 = "<http://www.disit.org/km4city/resource/" + entry_name + "_Route_" + str(
-                trips["route_id"][i]) + ">"
-            short_name = str(trips["trip_short_name"][i])
-            if short_name == "nan":
-                short_name = "NULL"
-
-            f.write(
-                first_term + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Trip> .\n")
-            f.write(first_term_var + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + "_Service_" +
-                    str(trips["service_id"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://vocab.gtfs.org/terms#route> <http://www.disit.org/km4city/resource/" + entry_name + "_Route_" + str(
-                    trips["route_id"][i]) + "> .\n")
-            f.write(
-                first_term + " <http://vocab.gtfs.org/terms#direction> " + '"' + str(
-                    trips["direction_id"][i]) + '" .\n')
-            f.write(first_term_var2 + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + "_Shape_" + str(
-                trips["shape_id"][i]) + '" .\n')
-            f.write(
-                first_term + " <http://www.opengis.net/ont/geosparql#hasGeometry> <http://www.disit.org/km4city/resource/" + entry_name + "_Shape_" + str(
-                    trips["shape_id"][i]) + "> .\n")
-            f.write(
-                first_term_var + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Service> .\n")
-            f.write(first_term + ' <http://vocab.gtfs.org/terms#shortName> "' + short_name + '" .\n')
-            f.write(
-                first_term_var3 + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Route> .\n")
-            f.write(first_term + ' <http://purl.org/dc/terms/identifier> "' + entry_name + "_Trip_" + str(trips["trip_id"][
-                i]) + '" .\n')
-            f.write(
-                first_term + " <http://vocab.gtfs.org/terms#service> <http://www.disit.org/km4city/resource/" + entry_name + "_Service_" +
-                str(trips["service_id"][i]) + "> .\n")
-            f.write(first_term_var3 + ' <http://purl.org/dc/terms/identifier> "' + entry_name + "_Route_" + str(
-                trips["route_id"][i]) + '". \n')
-            f.write(
-                first_term_var2 + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.opengis.net/ont/geosparql#Geometry> .\n\n")
-
-            f.write("\n")
-        f.close()
-
-    def _extract_shapes_triples(self, entry_name):
-        shapes = pd.read_csv(self.output_directory + os.sep + 'shapes.txt', delimiter=',', low_memory=True, dtype=str)
+        with self._open_stage('trips', _shard_path(self.output_directory + os.sep + "trips.n3", rows)) as f:
+            for trips in f.read(_read_table(feed, "trips.txt", chunk_size, rows, self._feed_cache, delimiter=",")):
+                self._write_trips(f, entry_name, trips)
+        return f.report
+
+    def _write_trips(self, f, entry_name, trips):
+        for trips in _blocks(trips):
+            trip_id = _str_column(trips["trip_id"])
+            service_id = _str_column(trips["service_id"])
+            shape_id = _str_column(trips["shape_id"])
+            route_id = _str_column(trips["route_id"])
+            short_name = _str_column(trips["trip_short_name"])
+            short_name[short_name == "nan"] = "NULL"
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Trip_" + trip_id + ">"
+            first_term_var = "<http://www.disit.org/km4city/resource/" + entry_name + "_Service_" + service_id + ">"
+            first_term_var2 = "<http://www.disit.org/km4city/resource/" + entry_name + "_Shape_" + shape_id + ">"
+            first_term_var3 = "<http://www.disit.org/km4city/resource/" + entry_name + "_Route_" + route_id + ">"
+            # type and identifier of the service, shape and route are written by calendar_dates.n3, shapes.n3 and
+            # routes.n3
+            _write_rows(f, [
+                first_term,
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Trip> .\n",
+                first_term, " <http://vocab.gtfs.org/terms#route> ", first_term_var3, " .\n",
+                first_term, " <http://vocab.gtfs.org/terms#direction> ",
+                '"', _str_column(trips["direction_id"]), '" .\n',
+                first_term, " <http://www.opengis.net/ont/geosparql#hasGeometry> ", first_term_var2, " .\n",
+                first_term, ' <http://vocab.gtfs.org/terms#shortName> "', short_name, '" .\n',
+                first_term, ' <http://purl.org/dc/terms/identifier> "' + entry_name + "_Trip_", trip_id, '" .\n',
+                first_term, " <http://vocab.gtfs.org/terms#service> ", first_term_var, " .\n",
+                "\n",
+            ])
+
+    @staticmethod
+    def _collect_shapes(feed: ZipFile, chunk_size: int = None, rows: tuple = None, cache: str = None):
+        # shape points as compact columns, in file order; a shape may span several chunks
+        points = list(_read_table(feed, 'shapes.txt', chunk_size, rows, cache, delimiter=',', usecols=list(_SHAPE_DTYPES),
+                                  dtype=_SHAPE_DTYPES))
+        if not points:
+            return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in _SHAPE_DTYPES.items()})
+        return pd.concat(points, ignore_index=True)
+
+    def _extract_shapes_triples(self, entry_name, feed: ZipFile, chunk_size: int = None, shape_precision: int = None):
         print("Write triples for shapes")
-        shape = dict()
-        for i in range(len(shapes['shape_id'])):
-            if shapes['shape_id'][i] not in shape.keys():
-                shape.update({shapes['shape_id'][i]: ""})
-            shape[shapes['shape_id'][i]] += """, %s %s""" % (shapes['shape_pt_lon'][i], shapes['shape_pt_lat'][i])
-
-        f = open(self.output_directory + os.sep + 'shapes.n3', 'w+')
-        for element in shape.keys():
-            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Shape_" + str(element) + ">"
-            # identifier
-            f.write(first_term + " <http://purl.org/dc/terms/identifier> " + '"' + entry_name + '_Shape_' + str(
-                element) + '" .\n')
-            # syntax_type
-            f.write(first_term + " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> " +
-                    "<http://www.opengis.net/ont/geosparql#Geometry> .\n")
-            # shape points
-            f.write(first_term + ' <http://www.opengis.net/ont/geosparql#asWKT> "LINESTRING((' +
-                    shape[element][2:] + '))" .\n\n')
-        f.close()
-
-    def _extract_routes_triples(self, entry_name):
-        # added _agency_id since there is not a column called ageny_id in routes.csv file and there is only one agency in my case
-        _agency_id = 'OASA'
-        routes = pd.read_csv(self.output_directory + os.sep + "routes.txt", delimiter=",", low_memory=True)
+        with self._open_stage('shapes', self.output_directory + os.sep + 'shapes.n3') as f:
+            points = self._collect_shapes(feed, chunk_size, cache=self._feed_cache)
+            f.report['rows'] = len(points)
+            self._write_shapes(f, entry_name, _shapes_frame(points, shape_precision))
+        return f.report
+
+    def _write_shapes(self, f, entry_name, shapes):
+        for shapes in _blocks(shapes):
+            element = _str_column(shapes['shape_id'])
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Shape_" + element + ">"
+            _write_rows(f, [
+                # identifier
+                first_term, " <http://purl.org/dc/terms/identifier> ", '"' + entry_name + '_Shape_', element, '" .\n',
+                # syntax_type
+                first_term, " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> ",
+                "<http://www.opengis.net/ont/geosparql#Geometry> .\n",
+                # shape points
+                first_term, ' <http://www.opengis.net/ont/geosparql#asWKT> "LINESTRING((',
+                _str_column(shapes['shape_points']), '))" .\n\n',
+            ])
+
+    def _extract_routes_triples(self, entry_name, feed: ZipFile, chunk_size: int = None):
         print("Write triples for routes")
-        f = open(self.output_directory + os.sep + "routes.n3", "w+")
-        for i in range(len(routes['route_id'])):
-            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Route_" + str(
-                routes["route_id"][i]) + ">"
-            # replaced this since there is no agency_id in route files and there is onle one agency available
-            #agency_first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Agency_" + \
-            #                    str(routes["agency_id"][i]) + ">"
-            agency_first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Agency_" + \
-                                _agency_id + ">"
-            f.write(first_term + """ <http://purl.org/dc/terms/identifier> "%s_Route_%s" . \n"""
-                    % (entry_name, str(routes['route_id'][i])))
-            f.write("""%s <http://vocab.gtfs.org/terms#color> "%s" .\n""" % (first_term, routes['route_color'][i]))
-            f.write(
-                """%s <http://vocab.gtfs.org/terms#textColor> "%s" .\n""" % (first_term, routes['route_text_color'][i]))
-            f.write("""%s <http://vocab.gtfs.org/terms#longName> "%s" .\n""" % (
-            first_term, str(routes['route_long_name'][i]).replace('"', r'\"')))
-            f.write("""%s <http://vocab.gtfs.org/terms#shortName> "%s" . \n""" % (first_term,
-                                                                                  str(routes['route_short_name'][
-                                                                                          i]).replace('"', r'\"')))
-            #f.write("""%s <http://purl.org/dc/terms/identifier> "%s_Agency_%s" . \n""" % (agency_first_term, entry_name,
-            #                                                                              str(routes['agency_id'][i])))
-            f.write("""%s <http://purl.org/dc/terms/identifier> "%s_Agency_%s" . \n""" % (agency_first_term, entry_name,
-                                                                                          _agency_id))
-            f.write("""%s <http://vocab.gtfs.org/terms#agency> %s .\n""" % (first_term, agency_first_term))
-            f.write("""%s <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Agency> .\n"""
-                    % agency_first_term)
-            f.write("""%s <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Route> .\n"""
-                    % first_term)
-            if (id := int(routes['route_type'][i])) in range(0, 8):
-                # id definiti tra 0 e 7, vedi _route_type
-                f.write(
-                    """%s <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#RouteType> . \n"""
-                    % self._route_type[id])
-                f.write("""%s <http://vocab.gtfs.org/terms#routeType> %s . \n\n""" % (first_term, self._route_type[id]))
-
-    def _extract_triple(self, entry_name, file_path, save_original: bool = False):
-        # per testare un file di prova decommentare sotto
-        # file_path = os.path.abspath('Bus_cttnordlucca-2.gtfs')
-        print(file_path)
-        with ZipFile(file_path, 'r') as zip_obj:
-            zip_obj.extractall(self.output_directory)
-        self._extract_agencies_triples(entry_name)
-        self._extract_calendar_dates_triples(entry_name)
-        self._extract_stop_triples(entry_name)
-        self._extract_stop_times_triples(entry_name)
-        self._extract_trips_triples(entry_name)
-        self._extract_shapes_triples(entry_name)
-        self._extract_routes_triples(entry_name)
+        with self._open_stage('routes', self.output_directory + os.sep + "routes.n3") as f:
+            # agencies of agency.txt are declared by agency.n3
+            agency_id = pd.unique(_agency_ids(next(_read_table(feed, 'agency.txt', cache=self._feed_cache)),
+                                              entry_name))
+            declared = set("<http://www.disit.org/km4city/resource/" + entry_name + "_Agency_" + agency_id + ">")
+            for routes in f.read(_read_table(feed, "routes.txt", chunk_size, cache=self._feed_cache, delimiter=",")):
+                self._write_routes(f, entry_name, routes, declared, agency_id[0])
+        return f.report
 
-        data_version = """<http://www.disit.org/km4city/resource/%s> <http://purl.org/dc/terms/date> "%s"^^<http://www.w3.org/2001/XMLSchema#dateTime> .
-        """ % (entry_name, datetime.datetime.now(pytz.utc).isoformat())
-        f = open(self.output_directory + os.sep + "dataset_version.n3", 'w+')
-        f.write(data_version)
-        f.close()
+    def _write_routes(self, f, entry_name, routes, declared: set = None, agency_id: str = None):
+        # the agency and every route type are declared once, not once per route
+        declared = set() if declared is None else declared
+        for routes in _blocks(routes):
+            route_id = _str_column(routes["route_id"])
+            first_term = "<http://www.disit.org/km4city/resource/" + entry_name + "_Route_" + route_id + ">"
+            # agency_id of routes.txt may be missing when the feed has a single agency, that is ``agency_id``
+            route_agency = np.full(len(route_id), agency_id, dtype=object)
+            if 'agency_id' in routes:
+                column = routes['agency_id']
+                given = column.notna().to_numpy()
+                route_agency[given] = _str_column(column[given])
+            if (route_agency == None).any():
+                raise ValueError("Routes without agency_id and no agency given for them")
+            agency_first_term = \
+                "<http://www.disit.org/km4city/resource/" + entry_name + "_Agency_" + route_agency + ">"
+            # id definiti tra 0 e 7, vedi _route_type; le righe senza tipo noto non hanno triple di tipo
+            route_type = np.array([self._route_type.get(id) for id in routes['route_type'].astype(int).tolist()],
+                                  dtype=object)
+            known_type = route_type != None
+            agency_declaration = np.full(len(route_id), "", dtype=object)
+            first_agency = ~_declared(agency_first_term, declared)
+            agency_declaration[first_agency] = \
+                agency_first_term[first_agency] + ' <http://purl.org/dc/terms/identifier> "' + entry_name + \
+                '_Agency_' + route_agency[first_agency] + '" . \n' + agency_first_term[first_agency] + \
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Agency> .\n"
+            route_type_triples = np.full(len(route_type), "", dtype=object)
+            route_type_triples[known_type] = \
+                first_term[known_type] + " <http://vocab.gtfs.org/terms#routeType> " + route_type[known_type] + \
+                " . \n\n"
+            first_type = known_type.copy()
+            first_type[known_type] = ~_declared(route_type[known_type], declared)
+            route_type_triples[first_type] = \
+                route_type[first_type] + \
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#RouteType> . \n" + \
+                route_type_triples[first_type]
+            _write_rows(f, [
+                first_term, ' <http://purl.org/dc/terms/identifier> "' + entry_name + "_Route_", route_id, '" . \n',
+                first_term, ' <http://vocab.gtfs.org/terms#color> "', _str_column(routes['route_color']), '" .\n',
+                first_term, ' <http://vocab.gtfs.org/terms#textColor> "',
+                _str_column(routes['route_text_color']), '" .\n',
+                first_term, ' <http://vocab.gtfs.org/terms#longName> "',
+                _escape_quotes(_str_column(routes['route_long_name'])), '" .\n',
+                first_term, ' <http://vocab.gtfs.org/terms#shortName> "',
+                _escape_quotes(_str_column(routes['route_short_name'])), '" . \n',
+                agency_declaration,
+                first_term, " <http://vocab.gtfs.org/terms#agency> ", agency_first_term, " .\n",
+                first_term,
+                " <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://vocab.gtfs.org/terms#Route> .\n",
+                route_type_triples,
+            ])
+
+    def _checkpointed(self, checkpoint: _Checkpoint, stage: str, extractor, *args):
+        """Run the extractor of ``stage`` and record its report, unless a previous run completed it."""
+        report = checkpoint.stage(stage)
+        if report is not None:
+            print("Skip %s, converted by a previous run" % stage)
+            return report
+        report = extractor(*args)
+        checkpoint.complete(stage, report)
+        return report
+
+    def _extract_in_chunks(self, checkpoint: _Checkpoint, stage: str, name: str, output: str, writer: str,
+                           entry_name, feed: ZipFile, chunk_size: int):
+        # the chunks are appended to a single output whose progress is recorded after each of them, a rerun
+        # truncates the output to the last progress and carries on with the next chunk
+        print("Write triples for %s" % stage)
+        path = self.output_directory + os.sep + output
+        progress = checkpoint.progress(stage)
+        if progress is not None and not self.sink.resumable(path, progress['offset']):
+            progress = None
+        if progress is not None:
+            print("Resume %s from row %d, converted by a previous run up to there" % (stage, progress['rows']))
+        with self._open_stage(stage, path, progress) as f:
+            for chunk in f.read(_read_table(feed, name, chunk_size, (f.report['rows'], None), self._feed_cache,
+                                            delimiter=',')):
+                getattr(self, writer)(f, entry_name, chunk)
+                checkpoint.complete_chunk(stage, f.progress())
+        return f.report
 
-        if os.path.exists(self.output_directory + os.sep + "agency.txt"):
-            os.remove(self.output_directory + os.sep + "agency.txt")
-        
-        if os.path.exists(self.output_directory + os.sep + "calendar_dates.txt"):
-            os.remove(self.output_directory + os.sep + "calendar_dates.txt")
+    def _extract_in_parallel(self, entry_name, file_path, checkpoint: _Checkpoint, chunk_size: int = None,
+                             workers: int = 1, shape_precision: int = None):
+        # the large tables are split in row ranges converted side by side, then joined back in order; the stages
+        # and row ranges completed by a previous run are not converted again
+        with ZipFile(file_path, 'r') as feed:
+            shards = {name: _shard_rows(feed, name, workers) for name in ('stop_times.txt', 'trips.txt', 'shapes.txt')}
+        for stage in ('agency', 'calendar_dates', 'stops', 'stop_times', 'trips', 'shapes', 'routes'):
+            if checkpoint.stage(stage) is not None:
+                print("Skip %s, converted by a previous run" % stage)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            if self._feed_cache is not None:
+                # every table is parsed into the cache once, not by each of its shards
+                for task in [pool.submit(_call_with_feed, _cache_table, file_path, name, self._feed_cache)
+                             for name in _GTFS_SCHEMA]:
+                    task.result()
+            # the shards are parsed with the dtypes of _GTFS_SCHEMA, the same for the whole table
+            tasks = dict()
+            for stage, extractor in (('agency', self._extract_agencies_triples),
+                                     ('calendar_dates', self._extract_calendar_dates_triples),
+                                     ('stops', self._extract_stop_triples), ('routes', self._extract_routes_triples)):
+                if checkpoint.stage(stage) is None:
+                    tasks[pool.submit(_call_with_feed, partial(extractor, entry_name), file_path, chunk_size)] = \
+                        (stage, None)
+            shapes = [] if checkpoint.stage('shapes') is not None else \
+                [pool.submit(_call_with_feed, self._collect_shapes, file_path, chunk_size, rows, self._feed_cache)
+                 for rows in shards['shapes.txt']]
+            for stage, name, extractor in (('stop_times', 'stop_times.txt', self._extract_stop_times_triples),
+                                           ('trips', 'trips.txt', self._extract_trips_triples)):
+                if checkpoint.stage(stage) is None:
+                    done = checkpoint.parts(stage)
+                    tasks.update({pool.submit(_call_with_feed, partial(extractor, entry_name), file_path, chunk_size,
+                                              rows): (stage, rows[0])
+                                  for rows in shards[name] if rows[0] not in done})
 
-        if os.path.exists(self.output_directory + os.sep + "calendar.txt"):
-            os.remove(self.output_directory + os.sep + "calendar.txt")
+            # every task is recorded as soon as it ends, so that a failed one does not lose the others
+            failure = None
+            for task in as_completed(tasks):
+                stage, start = tasks[task]
+                try:
+                    report = task.result()
+                except Exception as error:
+                    failure = failure or error
+                    continue
+                if start is None:
+                    checkpoint.complete(stage, report)
+                else:
+                    checkpoint.complete_part(stage, start, report)
+            if failure is not None:
+                raise failure
 
-        if os.path.exists(self.output_directory + os.sep + "routes.txt"):
-            os.remove(self.output_directory + os.sep + "routes.txt")
+            if shapes:
+                print("Write triples for shapes")
+                with self._open_stage('shapes', self.output_directory + os.sep + 'shapes.n3') as f:
+                    points = pd.concat([task.result() for task in shapes], ignore_index=True)
+                    f.report['rows'] = len(points)
+                    self._write_shapes(f, entry_name, _shapes_frame(points, shape_precision))
+                checkpoint.complete('shapes', f.report)
 
-        if os.path.exists(self.output_directory + os.sep + "shapes.txt"):
-            os.remove(self.output_directory + os.sep + "shapes.txt")
+        for stage, name, output in (('stop_times', 'stop_times.txt', 'StopTimes.n3'),
+                                    ('trips', 'trips.txt', 'trips.n3')):
+            if checkpoint.stage(stage) is None:
+                path = self.output_directory + os.sep + output
+                self.sink.join(path, [_shard_path(path, rows) for rows in shards[name]])
+                parts = checkpoint.parts(stage)
+                checkpoint.complete(stage, _merge_reports([parts[rows[0]] for rows in shards[name]]))
 
-        if os.path.exists(self.output_directory + os.sep + "stop_times.txt"):
-            os.remove(self.output_directory + os.sep + "stop_times.txt")
+        return [checkpoint.stage(stage)
+                for stage in ('agency', 'calendar_dates', 'stops', 'stop_times', 'trips', 'shapes', 'routes')]
 
-        if os.path.exists(self.output_directory + os.sep + "stops.txt"):
-            os.remove(self.output_directory + os.sep + "stops.txt")
+    def _extract_incremental(self, entry_name, file_path, shape_precision: int = None):
+        # rows are compared by primary key and content hash with the state of the previous run, then only the triples
+        # of added/changed rows and of removed/changed rows are written, to <file>.added.n3 and <file>.removed.n3
+        state_directory = self.output_directory + os.sep + 'incremental_state'
+        os.makedirs(state_directory, exist_ok=True)
+        previous_entry_name = None
+        if os.path.exists(state_directory + os.sep + 'state.json'):
+            with open(state_directory + os.sep + 'state.json') as f:
+                previous_entry_name = json.load(f)['entry_name']
 
-        if os.path.exists(self.output_directory + os.sep + "transfers.txt"):
-            os.remove(self.output_directory + os.sep + "transfers.txt")
+        tables, previous_tables, added, removed = dict(), dict(), dict(), dict()
+        with ZipFile(file_path, 'r') as feed:
+            for name, output, writer, key, subject, predicate in self._incremental_tables:
+                if name == 'shapes.txt':
+                    table = _shapes_frame(self._collect_shapes(feed, cache=self._feed_cache), shape_precision)
+                else:
+                    table = next(_read_table(feed, name, cache=self._feed_cache))
+                if name == 'agency.txt':
+                    # the primary key of an agency without agency_id, see _agency_ids
+                    table['agency_id'] = _agency_ids(table, entry_name)
+                table['_row_hash'] = pd.util.hash_pandas_object(table, index=False).to_numpy()
+                tables[name] = table
 
-        if os.path.exists(self.output_directory + os.sep + "trips.txt"):
-            os.remove(self.output_directory + os.sep + "trips.txt")
+                previous = None
+                state_path = state_directory + os.sep + name[:-len('.txt')] + '.pkl'
+                if previous_entry_name is not None and os.path.exists(state_path):
+                    previous = pd.read_pickle(state_path)
+                previous_tables[name] = previous
+                if previous_entry_name != entry_name:
+                    # every triple changes with the entry name, compare against an empty state
+                    added[name], removed[name] = table, previous
+                else:
+                    added[name] = table[_unmatched_rows(table, previous, key)]
+                    removed[name] = None if previous is None else previous[_unmatched_rows(previous, table, key)]
+
+        reports = []
+        agency_id = pd.unique(tables['agency.txt']['agency_id'].to_numpy(dtype=object))
+        for name, output, writer, key, subject, predicate in self._incremental_tables:
+            print("Write delta triples for %s" % name[:-len('.txt')])
+            path = self.output_directory + os.sep + output
+            with self._open_stage(name[:-len('.txt')] + '.added', _delta_path(path, 'added')) as f:
+                rows = added[name].drop(columns='_row_hash')
+                f.report['rows'] = len(rows)
+                if name == 'calendar_dates.txt':
+                    self._write_calendar_dates(f, entry_name, rows)
+                    # services of calendar.txt referenced by the added trips, see _extract_calendar_dates_triples
+                    service_id = pd.unique(_str_column(added['trips.txt']['service_id']))
+                    self._write_services(f, entry_name, service_id[
+                        ~np.isin(service_id, _str_column(tables[name]['service_id']))])
+                elif name == 'routes.txt':
+                    self._write_routes(f, entry_name, rows, set(
+                        "<http://www.disit.org/km4city/resource/" + entry_name + "_Agency_" + agency_id + ">"),
+                        agency_id[0])
+                else:
+                    getattr(self, writer)(f, entry_name, rows)
+
+            reports.append(f.report)
+
+            with self._open_stage(name[:-len('.txt')] + '.removed', _delta_path(path, 'removed')) as f:
+                if removed[name] is not None:
+                    f.report['rows'] = len(removed[name])
+                    rendered = io.StringIO()
+                    rows = removed[name].drop(columns='_row_hash')
+                    if name == 'routes.txt':
+                        self._write_routes(rendered, previous_entry_name, rows, agency_id=agency_id[0])
+                    else:
+                        getattr(self, writer)(rendered, previous_entry_name, rows)
+                    owner = "<http://www.disit.org/km4city/resource/" + previous_entry_name + subject
+                    f.writelines(line + "\n" for line in rendered.getvalue().splitlines()
+                                 if line.startswith(owner) and (predicate is None or " " + predicate in line))
+                    if name == 'calendar_dates.txt':
+                        # services in neither calendar_dates.txt nor trips.txt any more lose their identifier and type
+                        service_id = pd.unique(np.concatenate([
+                            _str_column(previous_tables[table]['service_id'])
+                            for table in ('calendar_dates.txt', 'trips.txt') if previous_tables[table] is not None]))
+                        if previous_entry_name == entry_name:
+                            service_id = service_id[~np.isin(service_id, np.concatenate([
+                                _str_column(tables[table]['service_id'])
+                                for table in ('calendar_dates.txt', 'trips.txt')]))]
+                        self._write_services(f, previous_entry_name, service_id)
+            reports.append(f.report)
+
+        # the state is replaced only once every delta has been written, and once all of it is written aside
+        paths = [state_directory + os.sep + name[:-len('.txt')] + '.pkl' for name in tables]
+        for path, table in zip(paths, tables.values()):
+            table.to_pickle(path + '.tmp')
+        with open(state_directory + os.sep + 'state.json.tmp', 'w+') as f:
+            json.dump({'entry_name': entry_name}, f)
+        for path in paths + [state_directory + os.sep + 'state.json']:
+            os.replace(path + '.tmp', path)
+        return reports
+
+    def _extract_triple(self, entry_name, file_path, save_original: bool = False, chunk_size: int = None,
+                        workers: int = 1, incremental: bool = False, shape_precision: int = None):
+        # per testare un file di prova decommentare sotto
+        # file_path = os.path.abspath('Bus_cttnordlucca-2.gtfs')
+        print(file_path)
+        started = datetime.datetime.now(pytz.utc)
+        feed_hash = _feed_hash(file_path)
+        if self.cache_directory is not None:
+            self._feed_cache = self.cache_directory + os.sep + '%s-v%d' % (feed_hash, _CACHE_VERSION)
+        # the stages (and chunks) completed by a failed run with the same feed and options are not converted again
+        checkpoint = _Checkpoint(self.output_directory + os.sep + 'checkpoint.json', {
+            'feed': feed_hash, 'entry_name': entry_name, 'output_format': self.output_format,
+            'chunk_size': chunk_size, 'workers': workers, 'shape_precision': shape_precision})
+        wall, cpu = time.perf_counter(), os.times()
+        # GTFS tables are parsed straight from the archive members, nothing is extracted to disk
+        if incremental:
+            stages = self._extract_incremental(entry_name, file_path, shape_precision)
+        elif workers > 1:
+            stages = self._extract_in_parallel(entry_name, file_path, checkpoint, chunk_size, workers, shape_precision)
+        else:
+            with ZipFile(file_path, 'r') as feed:
+                if chunk_size is None:
+                    stop_times = (self._extract_stop_times_triples, entry_name, feed)
+                    trips = (self._extract_trips_triples, entry_name, feed)
+                else:
+                    stop_times = (partial(self._extract_in_chunks, checkpoint, 'stop_times', 'stop_times.txt',
+                                          'StopTimes.n3', '_write_stop_times'), entry_name, feed, chunk_size)
+                    trips = (partial(self._extract_in_chunks, checkpoint, 'trips', 'trips.txt', 'trips.n3',
+                                     '_write_trips'), entry_name, feed, chunk_size)
+                stages = [
+                    self._checkpointed(checkpoint, 'agency', self._extract_agencies_triples, entry_name, feed,
+                                       chunk_size),
+                    self._checkpointed(checkpoint, 'calendar_dates', self._extract_calendar_dates_triples, entry_name,
+                                       feed, chunk_size),
+                    self._checkpointed(checkpoint, 'stops', self._extract_stop_triples, entry_name, feed, chunk_size),
+                    self._checkpointed(checkpoint, 'stop_times', *stop_times),
+                    self._checkpointed(checkpoint, 'trips', *trips),
+                    self._checkpointed(checkpoint, 'shapes', self._extract_shapes_triples, entry_name, feed,
+                                       chunk_size, shape_precision),
+                    self._checkpointed(checkpoint, 'routes', self._extract_routes_triples, entry_name, feed,
+                                       chunk_size),
+                ]
+        wall = time.perf_counter() - wall
+        # the worker processes are joined by now, their CPU time is in the children times
+        cpu = sum(os.times()[:4]) - sum(cpu[:4])
+
+        data_version = """<http://www.disit.org/km4city/resource/%s> <http://purl.org/dc/terms/date> "%s"^^<http://www.w3.org/2001/XMLSchema#dateTime> .
+        """ % (entry_name, datetime.datetime.now(pytz.utc).isoformat())
+        with self.sink.open(self.output_directory + os.sep + "dataset_version.n3") as f:
+            f.write(data_version)
+
+        # machine readable report of the run, next to dataset_version.n3
+        triples = sum(stage['triples'] for stage in stages)
+        peak_rss = [rss for rss in [stage['peak_rss_bytes'] for stage in stages] + [_peak_rss()] if rss is not None]
+        report = {
+            'entry_name': entry_name,
+            'started': started.isoformat(),
+            'finished': datetime.datetime.now(pytz.utc).isoformat(),
+            'mode': 'incremental' if incremental else 'parallel' if workers > 1 else 'serial',
+            'output_format': self.output_format,
+            'chunk_size': chunk_size,
+            'workers': workers,
+            'rows': sum(stage['rows'] for stage in stages),
+            'triples': triples,
+            'bytes': sum(stage['bytes'] for stage in stages),
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'triples_per_second': triples / wall if wall else None,
+            'peak_rss_bytes': max(peak_rss, default=None),
+            'stages': stages,
+        }
+        report_path = self.output_directory + os.sep + 'run_report.json'
+        with open(report_path + '.tmp', 'w+') as f:
+            json.dump(report, f, indent=2)
+        os.replace(report_path + '.tmp', report_path)
+        print("Wrote %d triples in %.1fs, %.0f triples/s" % (triples, wall, report['triples_per_second'] or 0))
+        checkpoint.remove()
 
         if not save_original:
             os.remove(file_path)
+        return report
     
-    def get_triples(self, entry_name: str = None, save_original: bool = False):
+    def get_triples(self, entry_name: str = None, save_original: bool = False, chunk_size: int = None,
+                    workers: int = 1, incremental: bool = False, shape_precision: int = None, file_path: str = None):
         if entry_name is None:
             entry_name = 'Bus_OASA'
+        if incremental and (chunk_size is not None or workers > 1):
+            raise ValueError("The incremental conversion works on whole tables in a single process")
 
         # replace string for file_path 'public.zip' according to your file
-        file_path = self.output_directory + os.sep + 'public.zip'
+        if file_path is None:
+            file_path = self.output_directory + os.sep + 'public.zip'
+
+        return self._extract_triple(entry_name, file_path, save_original, chunk_size, workers, incremental,
+                                   shape_precision)
+
+
+def read_manifest(path: str):
+    """The (zip path, entry name) pairs of a batch manifest, a CSV file with file_path and entry_name columns.
+
+    Relative zip paths are relative to the manifest directory.
+    """
+    # entry names such as NA or null are names, not missing values
+    manifest = pd.read_csv(path, dtype=str, skipinitialspace=True, keep_default_na=False)
+    if (manifest[['file_path', 'entry_name']] == '').any(axis=None):
+        raise ValueError("Every feed of the manifest %s needs a file_path and an entry_name" % path)
+    directory = os.path.dirname(os.path.abspath(path))
+    return [(os.path.join(directory, file_path), entry_name)
+            for file_path, entry_name in zip(manifest['file_path'], manifest['entry_name'])]
+
+
+def _convert_feed(output_dir: str, output_format: str, file_path: str, entry_name: str, chunk_size: int = None,
+                  incremental: bool = False, shape_precision: int = None, cache_dir: str = None):
+    converter = Converter(output_dir, output_format, cache_dir=cache_dir)
+    return converter.get_triples(entry_name, True, chunk_size, 1, incremental, shape_precision, file_path)
+
+
+def convert_feeds(feeds: list, output_dir: str = None, output_format: str = 'n3', workers: int = 1,
+                  chunk_size: int = None, incremental: bool = False, shape_precision: int = None, cache_dir: str = None):
+    """Convert several GTFS feeds, given as (zip path, entry name) pairs, ``workers`` feeds at a time.
+
+    Every feed is converted in its own OUTPUT_DIR/<entry name> directory, holding its triples, run report and
+    incremental state, and its zip is kept. A failed feed does not stop the others. The outcome of every feed is
+    written to OUTPUT_DIR/batch_report.json, and returned.
+    """
+    output_dir = os.path.abspath(output_dir if output_dir is not None else os.getcwd() + os.sep + 'output')
+    entry_names = [entry_name for file_path, entry_name in feeds]
+    duplicates = sorted(set(entry_name for entry_name in entry_names if entry_names.count(entry_name) > 1))
+    if duplicates:
+        raise ValueError("Entry names must be unique in a batch, repeated: %s" % ', '.join(duplicates))
+
+    started = datetime.datetime.now(pytz.utc)
+    wall = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # the largest feeds start first, so that the batch takes about as long as the largest feed
+        tasks = {entry_name: pool.submit(_convert_feed, output_dir + os.sep + entry_name, output_format, file_path,
+                                         entry_name, chunk_size, incremental, shape_precision, cache_dir)
+                 for file_path, entry_name in sorted(feeds, key=lambda feed: -os.path.getsize(feed[0])
+                                                     if os.path.exists(feed[0]) else 0)}
+        for file_path, entry_name in feeds:
+            result = {'file_path': file_path, 'entry_name': entry_name,
+                      'output_directory': output_dir + os.sep + entry_name}
+            try:
+                report = tasks[entry_name].result()
+            except Exception as error:
+                print("Conversion of %s failed: %s" % (entry_name, error))
+                result.update(status='failed', error='%s: %s' % (type(error).__name__, error))
+            else:
+                result.update({field: value for field, value in report.items()
+                               if field not in ('entry_name', 'stages')}, status='converted')
+            results.append(result)
+
+    converted = [result for result in results if result['status'] == 'converted']
+    report = {
+        'started': started.isoformat(),
+        'finished': datetime.datetime.now(pytz.utc).isoformat(),
+        'output_format': output_format,
+        'workers': workers,
+        'feeds': len(results),
+        'failed': len(results) - len(converted),
+        'triples': sum(result['triples'] for result in converted),
+        'bytes': sum(result['bytes'] for result in converted),
+        'wall_seconds': time.perf_counter() - wall,
+        'results': results,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(output_dir + os.sep + 'batch_report.json', 'w+') as f:
+        json.dump(report, f, indent=2)
+    print("Converted %d of %d feeds in %.1fs" % (len(converted), len(results), report['wall_seconds']))
+    return report
 
-        return self._extract_triple(entry_name, file_path, save_original)
-    
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Interface for connect to a Enroute Chouette application and export'
@@ -342,14 +1643,42 @@ if __name__ == '__main__':
     parser.add_argument('-o', '--output-directory', type=str, default=None,
                         help='The output directory of the triples. Default is inside current directory: '
                              + os.path.curdir + os.sep + 'output')
+    parser.add_argument('-f', '--output-format', type=str, default='n3',
+                        choices=['n3', 'gzip', 'zstd', 'binary', 'sqlite'],
+                        help='The format of the triples files: plain N3 text, gzip or zstd compressed text, a compact '
+                             'binary encoding with a shared term dictionary, or sqlite to load them in the quads table '
+                             'of OUTPUT_DIRECTORY/triples.sqlite. Default n3')
     parser.add_argument('-s', '--save', action='store_true',
                         help='This flag can be used to preserve the original GTFS export inside OUTPUT_FOLDER')
     parser.add_argument('-e', '--entry-name', type=str, default=None,
                         help='The name for the extracted data entries. Dafault Bus_OASA')
+    parser.add_argument('-c', '--chunk-size', type=int, default=None,
+                        help='Process every GTFS table in chunks of CHUNK_SIZE rows to bound memory usage. '
+                             'Default is to load each table at once')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of processes converting the GTFS tables in parallel. Default 1')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Write only the triples added and removed since the previous incremental run, to '
+                             '<file>.added.n3 and <file>.removed.n3 files')
+    parser.add_argument('-p', '--shape-precision', type=int, default=None,
+                        help='Round the shapes coordinates to SHAPE_PRECISION decimals, dropping the points that '
+                             'become duplicates. Default is to keep the coordinates as parsed')
+    parser.add_argument('-k', '--cache-directory', type=str, default=None,
+                        help='Keep the parsed GTFS tables in CACHE_DIRECTORY, by feed content, so that converting '
+                             'the same feed again skips the CSV parsing. Default no cache')
+    parser.add_argument('-b', '--batch', type=str, default=None,
+                        help='Convert the feeds of the BATCH manifest, a CSV file with file_path and entry_name '
+                             'columns, WORKERS feeds at a time, each into OUTPUT_DIRECTORY/<entry_name>')
     
     args = parser.parse_args()
     #print(args)
 
-    converter = Converter(args.output_directory)
+    if args.batch is not None:
+        report = convert_feeds(read_manifest(args.batch), args.output_directory, args.output_format, args.workers,
+                               args.chunk_size, args.incremental, args.shape_precision, args.cache_directory)
+        sys.exit(1 if report['failed'] else 0)
+
+    converter = Converter(args.output_directory, args.output_format, cache_dir=args.cache_directory)
     print('Args: [', converter, ']')
-    converter.get_triples(args.entry_name, args.save)
+    converter.get_triples(args.entry_name, args.save, args.chunk_size, args.workers, args.incremental,
+                          args.shape_precision)